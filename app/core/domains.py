@@ -0,0 +1,148 @@
+import os
+import time
+from threading import Lock
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+from dotenv import load_dotenv
+
+from app.core.resilience import CircuitBreaker, link_resilience
+from app.database.crud import get_domains_from_database
+
+# Load environment variables
+load_dotenv()
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000/shorten")
+DOMAIN_RELOAD_SECONDS = float(os.getenv("DOMAIN_RELOAD_SECONDS", "60"))
+
+
+def normalize_host(host: str) -> str:
+    """
+    Normalize a host name or Host header for registry lookups.
+
+    Args:
+        host (str): The host, optionally with a port.
+
+    Returns:
+        str: The lower-cased host without port.
+    """
+    return host.split(":", 1)[0].strip().lower()
+
+
+class DomainRegistry:
+    """
+    In-memory table of the branded short domains.
+
+    The table is loaded from the domains collection on first use and reloaded
+    every ``DOMAIN_RELOAD_SECONDS`` or on demand, so new domains are picked up
+    without a restart. Links of the default domain (``BASE_URL``) are stored
+    without a domain, which is represented by ``None``. Reloads go through
+    the circuit breaker of the database, if given.
+    """
+
+    def __init__(
+        self, default_base_url: str, reload_seconds: float, breaker: Optional[CircuitBreaker] = None
+    ):
+        self.default_base_url = default_base_url
+        self.reload_seconds = reload_seconds
+        self.breaker = breaker
+        self._domains: Dict[str, str] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = Lock()
+
+    def load(self, domain_collection) -> int:
+        """
+        Replace the table with the domains stored in the database.
+
+        Args:
+            domain_collection: The domains collection.
+
+        Returns:
+            int: The number of loaded domains.
+        """
+        domains = {
+            domain["host"]: domain["base_url"].rstrip("/")
+            for domain in get_domains_from_database(domain_collection)
+        }
+        with self._lock:
+            self._domains = domains
+            self._loaded_at = time.monotonic()
+        return len(domains)
+
+    def ensure_loaded(self, domain_collection) -> None:
+        """
+        Load the table if it was never loaded or is older than the reload interval.
+
+        Args:
+            domain_collection: The domains collection.
+        """
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.reload_seconds:
+            return
+        if self.breaker is not None and not self.breaker.allow_request():
+            return
+        try:
+            self.load(domain_collection)
+        except Exception as e:
+            print(f"Error reloading domains: {str(e)}")
+            if self.breaker is not None:
+                self.breaker.record_failure()
+            # Keep serving the last known table until the next reload; a table
+            # that was never loaded is retried on next use
+            if loaded_at is not None:
+                self._loaded_at = time.monotonic()
+        else:
+            if self.breaker is not None:
+                self.breaker.record_success()
+
+    @property
+    def loaded(self) -> bool:
+        """
+        Whether the table was loaded at least once; until then branded hosts are unknown.
+        """
+        return self._loaded_at is not None
+
+    @property
+    def default_host(self) -> str:
+        """
+        The host of the default domain's base URL.
+        """
+        return normalize_host(urlsplit(self.default_base_url).netloc)
+
+    def is_registered(self, host: str) -> bool:
+        return normalize_host(host) in self._domains
+
+    def resolve(self, host: Optional[str]) -> Optional[str]:
+        """
+        Resolve a request host to the domain its links are scoped to.
+
+        Args:
+            host (Optional[str]): The request host.
+
+        Returns:
+            Optional[str]: The registered domain, or None for the default domain.
+        """
+        if not host:
+            return None
+        host = normalize_host(host)
+        return host if host in self._domains else None
+
+    def base_url(self, domain: Optional[str]) -> str:
+        """
+        Return the base URL short links of a domain are built from.
+
+        Args:
+            domain (Optional[str]): The domain, or None for the default domain.
+
+        Returns:
+            str: The base URL without trailing slash.
+        """
+        if domain is None:
+            return self.default_base_url
+        return self._domains.get(domain, self.default_base_url)
+
+    def domains(self) -> Dict[str, str]:
+        return dict(self._domains)
+
+
+domain_registry = DomainRegistry(
+    BASE_URL.rstrip("/"), DOMAIN_RELOAD_SECONDS, link_resilience.breaker
+)
@@ -0,0 +1,218 @@
+import json
+import os
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from app.database.crud import iter_urls_from_database
+
+# Load environment variables
+load_dotenv()
+HOT_LINKS_TOP_K = int(os.getenv("HOT_LINKS_TOP_K", "100"))
+LINK_CACHE_SIZE = int(os.getenv("LINK_CACHE_SIZE", "10000"))
+LINK_CACHE_TTL_SECONDS = float(os.getenv("LINK_CACHE_TTL_SECONDS", "300"))
+# Counts are halved every this many hits so yesterday's viral links fade out
+HOT_LINKS_DECAY_EVERY = int(os.getenv("HOT_LINKS_DECAY_EVERY", "100000"))
+HOT_LINKS_SNAPSHOT = os.getenv("HOT_LINKS_SNAPSHOT", "hot_links.json")
+HOT_LINKS_PREWARM = os.getenv("HOT_LINKS_PREWARM", "0") == "1"
+
+
+class CountMinSketch:
+    """
+    Fixed-size frequency estimator; estimates never undercount.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """
+        Count a key and return its new estimated frequency.
+        """
+        estimate = None
+        for seed, row in enumerate(self.rows):
+            index = hash((seed, key)) % self.width
+            row[index] += count
+            estimate = row[index] if estimate is None else min(estimate, row[index])
+        return estimate
+
+    def halve(self) -> None:
+        for row in self.rows:
+            for index, value in enumerate(row):
+                row[index] = value >> 1
+
+
+class HeavyHitters:
+    """
+    Streaming top-K tracker: a Count-Min Sketch estimates every key and only
+    the K most frequent keys are kept, so memory does not grow with the long tail.
+    """
+
+    def __init__(self, k: int, decay_every: int = 0):
+        self.k = k
+        self.decay_every = decay_every
+        self.sketch = CountMinSketch()
+        self.top: Dict[str, int] = {}
+        self._floor = 0
+        self._offers = 0
+
+    def offer(self, key: str, count: int = 1) -> bool:
+        """
+        Count a key.
+
+        Returns:
+            bool: True if the key is among the top K after this hit.
+        """
+        if self.k <= 0:
+            return False
+        estimate = self.sketch.add(key, count)
+        self._offers += 1
+        if self.decay_every and self._offers % self.decay_every == 0:
+            self.decay()
+
+        if key in self.top or len(self.top) < self.k:
+            self.top[key] = estimate
+            return True
+        # Long-tail keys are rejected against a lower bound of the smallest
+        # top count; the top is only scanned when the key may displace it
+        if estimate <= self._floor:
+            return False
+        coldest = min(self.top, key=self.top.get)
+        if estimate > self.top[coldest]:
+            del self.top[coldest]
+            self.top[key] = estimate
+            self._floor = min(self.top.values())
+            return True
+        self._floor = self.top[coldest]
+        return False
+
+    def decay(self) -> None:
+        self.sketch.halve()
+        self.top = {key: count >> 1 for key, count in self.top.items()}
+        self._floor >>= 1
+
+    def most_common(self, limit: Optional[int] = None) -> List[tuple]:
+        ranked = sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:limit] if limit else ranked
+
+
+class HotLinkCache:
+    """
+    Two-tier cache of short ID to link mappings for redirects.
+
+    Links tracked among the top K are pinned and never evicted by the LRU
+    tier, so long-tail traffic cannot churn viral links out of the cache.
+    Entries of both tiers expire after ``ttl`` seconds so that changes such
+    as a link being flagged are picked up.
+    """
+
+    def __init__(self, top_k: int, size: int, ttl: float, decay_every: int = 0):
+        self.tracker = HeavyHitters(top_k, decay_every)
+        self.size = size
+        self.ttl = ttl
+        self.pinned: Dict[str, tuple] = {}
+        self.lru: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, short_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached url data of a short ID, or None on a miss.
+        """
+        with self._lock:
+            cached = self.pinned.get(short_id)
+            if cached is None:
+                cached = self.lru.get(short_id)
+                if cached is not None:
+                    self.lru.move_to_end(short_id)
+            if cached is None:
+                return None
+            url_data, expires_at = cached
+            if expires_at < time.monotonic():
+                self.pinned.pop(short_id, None)
+                self.lru.pop(short_id, None)
+                return None
+            return url_data
+
+    def put(self, short_id: str, url_data: Dict[str, Any]) -> None:
+        """
+        Cache url data, in the pinned tier if the short ID is hot.
+        """
+        entry = (url_data, time.monotonic() + self.ttl)
+        with self._lock:
+            if short_id in self.tracker.top:
+                self.pinned[short_id] = entry
+                return
+            self.lru[short_id] = entry
+            self.lru.move_to_end(short_id)
+            while len(self.lru) > self.size:
+                self.lru.popitem(last=False)
+
+    def invalidate(self, short_id: str) -> None:
+        with self._lock:
+            self.pinned.pop(short_id, None)
+            self.lru.pop(short_id, None)
+
+    def record_hit(self, short_id: str) -> None:
+        """
+        Feed a redirect to the heavy-hitter tracker and re-tier its entry.
+        """
+        with self._lock:
+            hot = self.tracker.offer(short_id)
+            if hot and short_id in self.lru:
+                self.pinned[short_id] = self.lru.pop(short_id)
+            # Links displaced from the top K go back to the LRU tier
+            if len(self.pinned) > self.tracker.k:
+                for cold in [key for key in self.pinned if key not in self.tracker.top]:
+                    self.lru[cold] = self.pinned.pop(cold)
+
+    def hot_links(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                {"short_id": short_id, "estimated_hits": hits, "pinned": short_id in self.pinned}
+                for short_id, hits in self.tracker.most_common(limit)
+            ]
+
+    def save_snapshot(self, path: str) -> int:
+        """
+        Write the tracked hot links to a JSON file.
+
+        Returns:
+            int: The number of saved links.
+        """
+        links = [
+            {"short_id": link["short_id"], "estimated_hits": link["estimated_hits"]}
+            for link in self.hot_links()
+        ]
+        with open(path, "w") as snapshot:
+            json.dump(links, snapshot)
+        return len(links)
+
+    def prewarm(self, path: str, url_collection) -> int:
+        """
+        Seed the tracker from a snapshot and pin the mappings of its links.
+
+        Returns:
+            int: The number of pinned links.
+        """
+        with open(path) as snapshot:
+            links = json.load(snapshot)[: self.tracker.k]
+        with self._lock:
+            for link in links:
+                self.tracker.offer(link["short_id"], link["estimated_hits"])
+
+        short_ids = [link["short_id"] for link in links]
+        pinned = 0
+        for url_data in iter_urls_from_database(url_collection, short_ids=short_ids):
+            self.put(url_data["short_id"], url_data)
+            pinned += 1
+        return pinned
+
+
+link_cache = HotLinkCache(
+    HOT_LINKS_TOP_K, LINK_CACHE_SIZE, LINK_CACHE_TTL_SECONDS, HOT_LINKS_DECAY_EVERY
+)
@@ -0,0 +1,247 @@
+import os
+import socket
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from dotenv import load_dotenv
+from fastapi import Depends
+from pymongo import ReturnDocument
+
+from app.database.connection import get_job_collection, get_url_collection
+
+# Load environment variables
+load_dotenv()
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_SECONDS = float(os.getenv("JOB_RETRY_SECONDS", "2"))
+# Running jobs are owned by a process for this long, renewed while they run;
+# jobs whose lease expired are resumed by the next process that starts
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# Owner of the jobs claimed by this process
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}-{uuid4().hex[:8]}"
+
+# Job states stored in the jobs collection
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# Handlers by job kind, called with the job payload and the urls collection
+_handlers: Dict[str, Callable[[Dict[str, Any], Any], None]] = {}
+
+# Bounded pool shared by all queues of the process
+_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="jobs")
+
+
+def job_handler(kind: str) -> Callable:
+    """
+    Register the decorated function as the handler of a job kind.
+
+    Args:
+        kind (str): The job kind.
+
+    Returns:
+        Callable: The decorator.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        _handlers[kind] = func
+        return func
+
+    return decorator
+
+
+def run_in_background(func: Callable, *args) -> Future:
+    """
+    Run a function on the shared worker pool.
+
+    Args:
+        func (Callable): The function to run.
+        *args: Its arguments.
+
+    Returns:
+        Future: The future of the call.
+    """
+    return _executor.submit(func, *args)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _lease_until() -> datetime:
+    return _now() + timedelta(seconds=JOB_LEASE_SECONDS)
+
+
+class JobQueue:
+    """
+    In-process background job queue with job state persisted in the database.
+
+    Jobs are stored before they are submitted to the worker pool, failed jobs
+    are retried with exponential backoff up to ``max_attempts`` times, and
+    jobs left pending, or running past their lease by a process that is gone,
+    are picked up again by ``resume``. Finished jobs carry ``finished_at`` and
+    are removed by a TTL index (see app/database/connection.py).
+    """
+
+    def __init__(self, job_collection, url_collection, executor: Optional[Executor] = None):
+        self.job_collection = job_collection
+        self.url_collection = url_collection
+        self.executor = executor or _executor
+
+    def _job_document(self, kind: str, payload: Dict[str, Any], max_attempts: int) -> Dict[str, Any]:
+        if kind not in _handlers:
+            raise ValueError(f"No handler registered for job kind {kind!r}")
+        now = _now()
+        return {
+            "_id": uuid4().hex,
+            "kind": kind,
+            "payload": payload,
+            "status": PENDING,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+
+    def enqueue(
+        self, kind: str, payload: Dict[str, Any], max_attempts: int = JOB_MAX_ATTEMPTS
+    ) -> str:
+        """
+        Store a job and submit it to the worker pool.
+
+        Args:
+            kind (str): The job kind, which must have a registered handler.
+            payload (Dict[str, Any]): The arguments passed to the handler.
+            max_attempts (int): Number of attempts before the job is marked failed.
+
+        Returns:
+            str: The job id.
+        """
+        return self.enqueue_many([(kind, payload)], max_attempts=max_attempts)[0]
+
+    def enqueue_many(
+        self, jobs: List[Tuple[str, Dict[str, Any]]], max_attempts: int = JOB_MAX_ATTEMPTS
+    ) -> List[str]:
+        """
+        Store several jobs with a single write and submit them to the worker pool.
+
+        Args:
+            jobs (List[Tuple[str, Dict[str, Any]]]): The kind and payload of each job.
+            max_attempts (int): Number of attempts before a job is marked failed.
+
+        Returns:
+            List[str]: The job ids, in the order of the jobs.
+        """
+        documents = [self._job_document(kind, payload, max_attempts) for kind, payload in jobs]
+        if not documents:
+            return []
+        self.job_collection.insert_many(documents)
+        for document in documents:
+            self.executor.submit(self.run_job, document["_id"])
+        return [document["_id"] for document in documents]
+
+    def run_job(self, job_id: str) -> Optional[str]:
+        """
+        Claim a pending job, run its handler and record the outcome.
+
+        Args:
+            job_id (str): The job id.
+
+        Returns:
+            Optional[str]: The job status after this attempt, or None if the
+            job was not pending.
+        """
+        job = self.job_collection.find_one_and_update(
+            {"_id": job_id, "status": PENDING},
+            {
+                "$set": {
+                    "status": RUNNING,
+                    "owner": WORKER_ID,
+                    "lease_until": _lease_until(),
+                    "updated_at": _now(),
+                },
+                "$inc": {"attempts": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        if job is None:
+            return None
+
+        stop_heartbeat = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat, args=(job_id, stop_heartbeat), daemon=True
+        )
+        heartbeat.start()
+        try:
+            _handlers[job["kind"]](job["payload"], self.url_collection)
+        except Exception as e:
+            status = PENDING if job["attempts"] < job["max_attempts"] else FAILED
+            update = {"status": status, "owner": None, "error": str(e), "updated_at": _now()}
+            if status == FAILED:
+                update["finished_at"] = _now()
+            self.job_collection.update_one({"_id": job_id, "owner": WORKER_ID}, {"$set": update})
+            if status == PENDING:
+                delay = JOB_RETRY_SECONDS * 2 ** (job["attempts"] - 1)
+                self._retry_later(job_id, delay)
+            else:
+                print(f"Job {job_id} ({job['kind']}) failed: {str(e)}")
+            return status
+        finally:
+            stop_heartbeat.set()
+
+        now = _now()
+        self.job_collection.update_one(
+            {"_id": job_id, "owner": WORKER_ID},
+            {"$set": {"status": DONE, "error": None, "updated_at": now, "finished_at": now}},
+        )
+        return DONE
+
+    def _heartbeat(self, job_id: str, stop: threading.Event) -> None:
+        # Renew the lease well before it expires while the handler runs
+        while not stop.wait(JOB_LEASE_SECONDS / 3):
+            try:
+                self.job_collection.update_one(
+                    {"_id": job_id, "status": RUNNING, "owner": WORKER_ID},
+                    {"$set": {"lease_until": _lease_until()}},
+                )
+            except Exception as e:
+                print(f"Error renewing the lease of job {job_id}: {str(e)}")
+
+    def _retry_later(self, job_id: str, delay: float) -> None:
+        timer = threading.Timer(delay, self.executor.submit, args=(self.run_job, job_id))
+        timer.daemon = True
+        timer.start()
+
+    def resume(self) -> int:
+        """
+        Resubmit pending jobs and the running jobs whose lease has expired.
+
+        Jobs still leased by a live process are left to it.
+
+        Returns:
+            int: The number of resubmitted jobs.
+        """
+        self.job_collection.update_many(
+            {
+                "status": RUNNING,
+                "$or": [{"lease_until": {"$lt": _now()}}, {"lease_until": {"$exists": False}}],
+            },
+            {"$set": {"status": PENDING, "owner": None, "updated_at": _now()}},
+        )
+        job_ids = [job["_id"] for job in self.job_collection.find({"status": PENDING}, {"_id": 1})]
+        for job_id in job_ids:
+            self.executor.submit(self.run_job, job_id)
+        return len(job_ids)
+
+
+def get_job_queue(
+    job_collection=Depends(get_job_collection),
+    url_collection=Depends(get_url_collection),
+) -> JobQueue:
+    return JobQueue(job_collection, url_collection)
@@ -0,0 +1,168 @@
+import html
+import ipaddress
+import os
+import re
+import socket
+import urllib.error
+import urllib.request
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+from dotenv import load_dotenv
+
+from app.core.jobs import JobQueue, job_handler
+from app.core.qr import generate_qr_code
+from app.core.resilience import link_resilience
+from app.database.crud import update_url_metadata
+
+# Load environment variables
+load_dotenv()
+# Reachability, safety and preview checks make outbound requests, so they are opt-in
+LINK_CHECKS_ENABLED = os.getenv("LINK_CHECKS_ENABLED", "0") == "1"
+LINK_CHECK_TIMEOUT = float(os.getenv("LINK_CHECK_TIMEOUT", "5"))
+BLOCKED_HOSTS = {
+    host.strip().lower() for host in os.getenv("BLOCKED_HOSTS", "").split(",") if host.strip()
+}
+PREVIEW_MAX_BYTES = 64 * 1024
+
+TITLE_PATTERN = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+
+
+class UnsafeURLError(urllib.error.URLError):
+    """
+    Raised for URLs that must not be fetched by the server.
+    """
+
+
+def ensure_public_url(url: str) -> None:
+    """
+    Check that a URL is an HTTP(S) URL whose host only resolves to public addresses.
+
+    Links are user input, so fetching them must not reach loopback, private,
+    link-local or other internal addresses of the server's network.
+
+    :param url: The URL to check.
+    :raises UnsafeURLError: If the URL must not be fetched.
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise UnsafeURLError(f"Not an HTTP URL: {url}")
+    try:
+        addresses = socket.getaddrinfo(parts.hostname, None, proto=socket.IPPROTO_TCP)
+    except socket.gaierror as e:
+        raise urllib.error.URLError(e)
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%", 1)[0])
+        if not address.is_global or address.is_multicast:
+            raise UnsafeURLError(f"{parts.hostname} resolves to a non-public address")
+
+
+class _PublicRedirectHandler(urllib.request.HTTPRedirectHandler):
+    """
+    Follows redirects only to URLs that pass ``ensure_public_url``.
+    """
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        ensure_public_url(newurl)
+        return super().redirect_request(req, fp, code, msg, headers, newurl)
+
+
+_opener = urllib.request.build_opener(_PublicRedirectHandler)
+
+
+def fetch_url(url: str, method: str = "GET", max_bytes: int = 0) -> Tuple[int, bytes]:
+    """
+    Request a URL and return its status code and up to max_bytes of the body.
+
+    The URL and every redirect are checked with ``ensure_public_url`` first.
+
+    :param url: The URL to request.
+    :param method: The HTTP method.
+    :param max_bytes: Maximum number of body bytes to read.
+    :return: The status code and the body read.
+    :raises UnsafeURLError: If the URL or a redirect points to a non-public address.
+    """
+    ensure_public_url(url)
+    request = urllib.request.Request(url, method=method, headers={"User-Agent": "url-shortener"})
+    try:
+        with _opener.open(request, timeout=LINK_CHECK_TIMEOUT) as response:
+            return response.status, response.read(max_bytes) if max_bytes else b""
+    except urllib.error.HTTPError as e:
+        return e.code, b""
+
+
+def is_blocked_host(url: str) -> bool:
+    """
+    Check whether the URL points to a blocked host or one of its subdomains.
+
+    :param url: The URL to check.
+    :return: True if the host is blocked.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    return any(host == blocked or host.endswith(f".{blocked}") for blocked in BLOCKED_HOSTS)
+
+
+def extract_title(body: bytes) -> Optional[str]:
+    """
+    Extract the page title from an HTML document.
+
+    :param body: The beginning of the HTML document.
+    :return: The unescaped title, or None if there is none.
+    """
+    match = TITLE_PATTERN.search(body)
+    if not match:
+        return None
+    title = html.unescape(match.group(1).decode("utf-8", errors="replace"))
+    return " ".join(title.split())[:200] or None
+
+
+@job_handler("render_qr")
+def render_qr(payload: Dict[str, Any], url_collection) -> None:
+    generate_qr_code(payload["link"], payload["short_id"])
+
+
+@job_handler("check_url")
+def check_url(payload: Dict[str, Any], url_collection) -> None:
+    url = payload["original_url"]
+    try:
+        status, _ = fetch_url(url, method="HEAD")
+        # Some servers refuse HEAD but serve the page
+        reachable = status < 400 or status == 405
+    except (urllib.error.URLError, OSError):
+        reachable = False
+    update_url_metadata(
+        payload["short_id"],
+        {"reachable": reachable, "flagged": is_blocked_host(url)},
+        url_collection,
+    )
+    # Redirects must see the flag without waiting for cached mappings to expire
+    link_resilience.invalidate(payload["short_id"])
+
+
+@job_handler("fetch_preview")
+def fetch_preview(payload: Dict[str, Any], url_collection) -> None:
+    # Network errors propagate so the job is retried; unsafe URLs never succeed
+    try:
+        status, body = fetch_url(payload["original_url"], max_bytes=PREVIEW_MAX_BYTES)
+    except UnsafeURLError as e:
+        print(f"Skipping preview of {payload['short_id']}: {str(e)}")
+        return
+    if status < 400:
+        update_url_metadata(payload["short_id"], {"title": extract_title(body)}, url_collection)
+
+
+def enqueue_link_post_processing(job_queue: JobQueue, url_data: Dict[str, Any], link: str) -> None:
+    """
+    Queue the slow steps that follow the creation of a short link.
+
+    :param job_queue: The background job queue.
+    :param url_data: The URL data added to the database.
+    :param link: The short URL the QR code encodes.
+    """
+    short_id = url_data["short_id"]
+    jobs = [("render_qr", {"short_id": short_id, "link": link})]
+    if LINK_CHECKS_ENABLED:
+        payload = {"short_id": short_id, "original_url": url_data["original_url"]}
+        jobs += [("check_url", payload), ("fetch_preview", payload)]
+    # A single write, so the jobs add one round trip to the link creation
+    job_queue.enqueue_many(jobs)
@@ -0,0 +1,79 @@
+from typing import Any, Dict, Optional, Tuple
+
+from app.database.crud import ShortIdTakenError, add_url_to_database, get_url_from_database
+
+# Attempts at allocating a free short ID for a new link
+SHORT_ID_ATTEMPTS = 3
+
+
+def create_short_id() -> str:
+    """
+    Generate a unique short ID for the shortened URL.
+
+    :return: A random 6-character string.
+    """
+    import shortuuid
+
+    return shortuuid.ShortUUID().random(length=6)
+
+
+def format_url_data(
+    original_url: str, short_id: str, domain: Optional[str] = None
+) -> dict:
+    """
+    Format URL data for storage in the database.
+
+    Only the original URL, short ID, hit count and domain are stored; the
+    short URL and QR code location are derived from them when responding.
+
+    :param original_url: The original long URL.
+    :param short_id: The unique short identifier.
+    :param domain: The short domain of the link, None for the default domain.
+    :return: A dictionary with formatted URL data.
+    """
+    return {
+        "original_url": original_url,
+        "short_id": short_id,
+        "hit_count": 0,
+        "domain": domain,
+    }
+
+
+def shorten_link(
+    original_url: str, domain: Optional[str], url_collection, url_hash_collection
+) -> Tuple[Dict[str, Any], bool]:
+    """
+    Return the link of an original URL in a domain, creating it if needed.
+
+    An original URL has a single link per domain; a new link gets a random
+    short ID, drawn again if it is already taken.
+
+    :param original_url: The original long URL.
+    :param domain: The short domain of the link, None for the default domain.
+    :param url_collection: MongoDB collection.
+    :param url_hash_collection: MongoDB url_hashes collection.
+    :return: The URL data and whether the link was created.
+    """
+    existing_url = get_url_from_database(
+        input={"original_url": original_url},
+        url_collection=url_collection,
+        domain=domain,
+        url_hash_collection=url_hash_collection,
+    )
+    if existing_url:
+        return existing_url, False
+
+    for attempt in range(SHORT_ID_ATTEMPTS):
+        url_data = format_url_data(original_url, create_short_id(), domain)
+        try:
+            url_data = add_url_to_database(
+                url_data=url_data,
+                url_collection=url_collection,
+                url_hash_collection=url_hash_collection,
+            )
+        except ShortIdTakenError:
+            # Random short IDs rarely collide; draw another one
+            if attempt + 1 == SHORT_ID_ATTEMPTS:
+                raise
+            continue
+        return url_data, True
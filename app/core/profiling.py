@@ -0,0 +1,331 @@
+import cProfile
+import logging
+import os
+import pstats
+import random
+import sys
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import wraps
+from threading import Event, Lock, Thread, get_ident
+from typing import Any, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+
+# Load environment variables
+load_dotenv()
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "500"))
+# Interval at which the stack of a sampled endpoint is captured for flame graphs
+PROFILE_STACK_INTERVAL_MS = float(os.getenv("PROFILE_STACK_INTERVAL_MS", "1"))
+PROFILE_HEADER = "X-Profile"
+
+logger = logging.getLogger(__name__)
+
+# Per-request trace shared between the middleware, dependencies and endpoints
+_request_trace: ContextVar[Optional[Dict[str, Any]]] = ContextVar(
+    "request_trace", default=None
+)
+
+_slow_requests: deque = deque(maxlen=100)
+_aggregate_lock = Lock()
+_aggregate_stats: Optional[pstats.Stats] = None
+_collapsed_stacks: Counter = Counter()
+_profile_samples = 0
+
+
+class _NoStage:
+    """
+    Stage timer used when profiling is disabled; does nothing.
+    """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _Stage:
+    """
+    Stage timer adding its elapsed time to the current request trace.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        trace = _request_trace.get()
+        if trace is not None:
+            elapsed = time.perf_counter() - self.start
+            stages = trace["stages"]
+            stages[self.name] = stages.get(self.name, 0.0) + elapsed
+        return False
+
+
+_NO_STAGE = _NoStage()
+
+
+def _format_frame(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+class _StackSampler:
+    """
+    Captures the full stack of one thread at a fixed interval, from a background thread.
+
+    ``stacks`` counts the samples of each stack, root first and frames
+    separated by ``;``, which is the collapsed format of flamegraph.pl.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+        return False
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                frames.append(_format_frame(frame))
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+
+def profile_stage(name: str):
+    """
+    Time a stage (auth, db, qr, ...) of the current request.
+
+    Args:
+        name (str): The stage name used in the slow-request log.
+
+    Returns:
+        A context manager; a shared no-op one when profiling is disabled.
+    """
+    if not PROFILING_ENABLED:
+        return _NO_STAGE
+    return _Stage(name)
+
+
+def profiled(func: Callable) -> Callable:
+    """
+    Capture a cProfile sample and the stacks of the decorated endpoint for sampled requests.
+
+    The profiler runs in the thread executing the endpoint, so it also covers
+    sync endpoints served from the threadpool; a sampler thread captures that
+    thread's full stack for flame graphs. The time the endpoint returns is
+    recorded so that ``ProfiledJSONResponse`` can time serialization. When
+    profiling is disabled the function is returned unchanged.
+
+    Args:
+        func (Callable): The endpoint function to wrap.
+
+    Returns:
+        Callable: The wrapped endpoint.
+    """
+    if not PROFILING_ENABLED:
+        return func
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        trace = _request_trace.get()
+        if trace is None:
+            return func(*args, **kwargs)
+        if not trace["sampled"]:
+            try:
+                return func(*args, **kwargs)
+            finally:
+                trace["returned_at"] = time.perf_counter()
+
+        profiler = cProfile.Profile()
+        sampler = _StackSampler(get_ident(), PROFILE_STACK_INTERVAL_MS / 1000)
+        try:
+            with sampler:
+                profiler.enable()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    profiler.disable()
+        finally:
+            add_profile_sample(profiler, sampler.stacks)
+            # Whatever FastAPI does next with the return value is serialization
+            trace["returned_at"] = time.perf_counter()
+
+    return wrapper
+
+
+def add_profile_sample(profiler: cProfile.Profile, stacks: Optional[Counter] = None) -> None:
+    """
+    Merge a finished profiler run into the aggregated statistics.
+
+    Args:
+        profiler (cProfile.Profile): The disabled profiler to merge.
+        stacks (Optional[Counter]): Sample counts by collapsed stack of the same run.
+    """
+    global _aggregate_stats, _profile_samples
+    with _aggregate_lock:
+        if _aggregate_stats is None:
+            _aggregate_stats = pstats.Stats(profiler)
+        else:
+            _aggregate_stats.add(profiler)
+        if stacks:
+            _collapsed_stacks.update(stacks)
+        _profile_samples += 1
+
+
+def _format_function(key) -> str:
+    filename, line, name = key
+    return f"{name} ({filename}:{line})"
+
+
+def dump_profile(limit: int = 50) -> Dict[str, Any]:
+    """
+    Return the aggregated profile as flame-graph friendly data.
+
+    ``collapsed`` holds ``root;...;leaf samples`` lines of the stacks captured
+    every ``PROFILE_STACK_INTERVAL_MS``, which can be fed to flamegraph.pl or
+    speedscope; ``functions`` lists the top cProfile entries by cumulative time.
+
+    Args:
+        limit (int): Maximum number of functions to return.
+
+    Returns:
+        Dict[str, Any]: The sample count, top functions and collapsed stacks.
+    """
+    with _aggregate_lock:
+        if _aggregate_stats is None:
+            return {"samples": 0, "functions": [], "collapsed": []}
+        raw_stats = dict(_aggregate_stats.stats)
+        stacks = _collapsed_stacks.most_common()
+        samples = _profile_samples
+
+    functions = [
+        {
+            "function": _format_function(key),
+            "calls": ncalls,
+            "total_time": tottime,
+            "cumulative_time": cumtime,
+        }
+        for key, (_, ncalls, tottime, cumtime, _) in raw_stats.items()
+    ]
+    functions.sort(key=lambda entry: entry["cumulative_time"], reverse=True)
+    collapsed = [f"{stack} {count}" for stack, count in stacks]
+    return {"samples": samples, "functions": functions[:limit], "collapsed": collapsed}
+
+
+def reset_profile() -> None:
+    """
+    Drop the aggregated profile and the slow-request log.
+    """
+    global _aggregate_stats, _profile_samples
+    with _aggregate_lock:
+        _aggregate_stats = None
+        _collapsed_stacks.clear()
+        _profile_samples = 0
+    _slow_requests.clear()
+
+
+def record_slow_request(
+    method: str, path: str, duration: float, stages: Dict[str, float]
+) -> Dict[str, Any]:
+    """
+    Log a slow request together with its stage breakdown.
+
+    Args:
+        method (str): The HTTP method.
+        path (str): The request path.
+        duration (float): Total request time in seconds.
+        stages (Dict[str, float]): Seconds spent per stage.
+
+    Returns:
+        Dict[str, Any]: The recorded entry, times in milliseconds.
+    """
+    stages_ms = {name: round(elapsed * 1000, 3) for name, elapsed in stages.items()}
+    entry = {
+        "method": method,
+        "path": path,
+        "duration_ms": round(duration * 1000, 3),
+        "stages_ms": stages_ms,
+        # Whatever is not covered by a stage: routing, validation, middleware
+        "other_ms": round((duration - sum(stages.values())) * 1000, 3),
+    }
+    _slow_requests.append(entry)
+    logger.warning("Slow request: %s", entry)
+    return entry
+
+
+def get_slow_requests() -> List[Dict[str, Any]]:
+    """
+    Return the most recent slow requests, oldest first.
+    """
+    return list(_slow_requests)
+
+
+class ProfiledJSONResponse(JSONResponse):
+    """
+    JSON response timing the serialization of a ``profiled`` endpoint's return value.
+
+    FastAPI encodes the value and renders this response right after the
+    endpoint returns, so the time since then is the serialization stage.
+    Used as the default response class when ``PROFILING_ENABLED=1``.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        trace = _request_trace.get()
+        if trace is not None and "returned_at" in trace:
+            elapsed = time.perf_counter() - trace.pop("returned_at")
+            stages = trace["stages"]
+            stages["serialization"] = stages.get("serialization", 0.0) + elapsed
+
+
+class ProfilingMiddleware(BaseHTTPMiddleware):
+    """
+    Open a request trace, decide whether to sample it and log slow requests.
+
+    A request is sampled when it carries ``X-Profile: 1`` or falls within
+    ``PROFILE_SAMPLE_RATE``. Only installed when ``PROFILING_ENABLED=1``.
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        sampled = request.headers.get(PROFILE_HEADER) == "1" or (
+            PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE
+        )
+        trace = {"sampled": sampled, "stages": {}}
+        token = _request_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            _request_trace.reset(token)
+
+        duration = time.perf_counter() - start
+        if duration * 1000 >= SLOW_REQUEST_MS:
+            record_slow_request(
+                request.method, request.url.path, duration, trace["stages"]
+            )
+        return response
@@ -0,0 +1,61 @@
+import io
+import os
+import tempfile
+
+QR_CODES_DIR = "qr_codes"
+
+
+def qr_code_path(short_id: str) -> str:
+    """
+    Return the file path of the QR code image for the given short ID.
+
+    :param short_id: The short identifier for the URL.
+    :return: File path of the QR code image.
+    """
+    return f"{QR_CODES_DIR}/{short_id}.png"
+
+
+def render_qr_png(link: str) -> bytes:
+    """
+    Render a QR code for the given link as PNG bytes.
+
+    :param link: The link to embed in the QR code.
+    :return: The PNG image.
+    """
+    # qrcode pulls in PIL, so it is only imported once a code is rendered
+    import qrcode
+
+    buffer = io.BytesIO()
+    qrcode.make(link).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def generate_qr_code(link: str, short_id: str) -> str:
+    """
+    Generate a QR code for the given link and save it as an image.
+
+    :param link: The link to embed in the QR code.
+    :param short_id: The short identifier for the URL.
+    :return: File path of the saved QR code image.
+    """
+    return save_qr_png(short_id, render_qr_png(link))
+
+
+def save_qr_png(short_id: str, png: bytes) -> str:
+    """
+    Save a rendered QR code image for the given short ID.
+
+    The image is written to a temporary file and moved into place, so a
+    concurrent reader never sees a partially written file.
+
+    :param short_id: The short identifier for the URL.
+    :param png: The PNG image.
+    :return: File path of the saved QR code image.
+    """
+    file_path = qr_code_path(short_id)
+    os.makedirs(QR_CODES_DIR, exist_ok=True)  # Ensure the directory exists
+    fd, tmp_path = tempfile.mkstemp(dir=QR_CODES_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as tmp_file:
+        tmp_file.write(png)
+    os.replace(tmp_path, file_path)
+    return file_path
@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from threading import Lock
+from typing import Iterable, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from app.core.qr import qr_code_path, render_qr_png
+
+# Load environment variables
+load_dotenv()
+QR_EXPORT_WORKERS = int(os.getenv("QR_EXPORT_WORKERS", str(os.cpu_count() or 1)))
+# Largest export served over HTTP; bigger ones go through `python -m app.tools export --with-qr`
+QR_EXPORT_MAX_LINKS = int(os.getenv("QR_EXPORT_MAX_LINKS", "10000"))
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = Lock()
+
+
+def get_export_pool() -> Executor:
+    """
+    Return the process pool QR images are rendered in, creating it on first use.
+
+    Workers are spawned rather than forked since the app process runs threads.
+
+    :return: The process pool.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=QR_EXPORT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+class _ChunkBuffer:
+    """
+    Write-only file object collecting the bytes written by ZipFile.
+
+    It is not seekable, so ZipFile writes a streamable archive and the
+    collected bytes can be sent and dropped after every entry.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_qr_zip(
+    links: Iterable[Tuple[str, str]], executor: Optional[Executor] = None
+) -> Iterator[bytes]:
+    """
+    Stream a ZIP archive with one QR code image per short link.
+
+    Images already rendered on disk are reused; the others are rendered in
+    parallel in the executor. At most a few images per worker are in flight,
+    and each one is written to the archive and sent as soon as it is ready,
+    so memory use does not depend on the number of links.
+
+    :param links: The (short ID, short URL) pairs to export.
+    :param executor: The executor to render in, the shared process pool by default.
+    :return: An iterator over the chunks of the ZIP archive.
+    """
+    executor = executor or get_export_pool()
+    window = max(1, QR_EXPORT_WORKERS) * 4
+    buffer = _ChunkBuffer()
+    pending = {}
+
+    try:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+
+            def write_done(futures) -> bytes:
+                for future in futures:
+                    archive.writestr(f"{pending.pop(future)}.png", future.result())
+                return buffer.drain()
+
+            for short_id, link in links:
+                file_path = qr_code_path(short_id)
+                if os.path.exists(file_path):
+                    with open(file_path, "rb") as image:
+                        archive.writestr(f"{short_id}.png", image.read())
+                    yield buffer.drain()
+                    continue
+
+                pending[executor.submit(render_qr_png, link)] = short_id
+                if len(pending) >= window:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    yield write_done(done)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield write_done(done)
+    finally:
+        # Drop queued renders if the client went away mid-stream
+        for future in pending:
+            future.cancel()
+
+    # Central directory written when the archive is closed
+    yield buffer.drain()
@@ -0,0 +1,237 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from app.core.hot_links import link_cache
+from app.database.crud import get_url_from_database, increment_hit_count
+from app.database.local_cache import LocalLinkStore
+
+# Load environment variables
+load_dotenv()
+DB_BREAKER_FAILURES = int(os.getenv("DB_BREAKER_FAILURES", "5"))
+DB_BREAKER_RESET_SECONDS = float(os.getenv("DB_BREAKER_RESET_SECONDS", "10"))
+LOCAL_LINK_CACHE_PATH = os.getenv("LOCAL_LINK_CACHE_PATH", "link_cache.sqlite3")
+# Local mappings younger than this are served without asking the database
+LOCAL_LINK_FRESH_SECONDS = float(os.getenv("LOCAL_LINK_FRESH_SECONDS", "60"))
+# Mappings kept in the local store; the least recently fetched are evicted
+LOCAL_LINK_CACHE_SIZE = int(os.getenv("LOCAL_LINK_CACHE_SIZE", "100000"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Stops calling the database after repeated failures.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls are refused for ``reset_timeout`` seconds; then a single trial
+    call is let through, which closes the breaker again if it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = Lock()
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = CLOSED
+            self._failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+
+class LinkResilience:
+    """
+    Keeps redirects up through database blips.
+
+    Mappings are served from the local store with stale-while-revalidate
+    semantics, database calls go through a circuit breaker, and hits are
+    buffered locally and written in the background, so they are kept
+    through outages and replayed after recovery.
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        breaker: CircuitBreaker,
+        fresh_seconds: float,
+        max_links: int = LOCAL_LINK_CACHE_SIZE,
+    ):
+        self.store_path = store_path
+        self.max_links = max_links
+        self.breaker = breaker
+        self.fresh_seconds = fresh_seconds
+        self._store: Optional[LocalLinkStore] = None
+        self._store_lock = Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="resilience")
+        self._in_flight = set()
+        self._in_flight_lock = Lock()
+
+    @property
+    def store(self) -> LocalLinkStore:
+        # Opened on first use so importing the app does not touch the disk
+        with self._store_lock:
+            if self._store is None:
+                self._store = LocalLinkStore(self.store_path, self.max_links)
+            return self._store
+
+    def _fetch(self, short_id: str, url_collection) -> Optional[Dict[str, Any]]:
+        try:
+            url_data = get_url_from_database(
+                input={"short_id": short_id}, url_collection=url_collection
+            )
+        except HTTPException:
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        if url_data:
+            self.store.put(url_data)
+        else:
+            self.store.delete(short_id)
+        return url_data
+
+    def _submit_once(self, key: str, func, *args) -> None:
+        with self._in_flight_lock:
+            if key in self._in_flight:
+                return
+            self._in_flight.add(key)
+
+        def run():
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"Background {key} failed: {str(e)}")
+            finally:
+                with self._in_flight_lock:
+                    self._in_flight.discard(key)
+
+        self._executor.submit(run)
+
+    def invalidate(self, short_id: str) -> None:
+        """
+        Drop the mapping of a short id from the local store and the memory cache.
+        """
+        self.store.delete(short_id)
+        link_cache.invalidate(short_id)
+
+    def _revalidate(self, short_id: str, url_collection) -> None:
+        self._fetch(short_id, url_collection)
+        # The memory tier must not keep serving an outdated mapping
+        link_cache.invalidate(short_id)
+
+    def resolve(self, short_id: str, url_collection) -> Optional[Dict[str, Any]]:
+        """
+        Return the url data of a short id, preferring the local store.
+
+        Fresh local mappings are served as is; stale ones are served while a
+        background refresh runs. Without a local mapping the database is
+        asked, unless the circuit breaker is open.
+
+        :param short_id: The short URL identifier.
+        :param url_collection: MongoDB collection.
+        :return: The url data, or None if the link does not exist.
+        :raises HTTPException: 503 if the database is unavailable and the link is not stored locally.
+        """
+        local = self.store.get(short_id)
+        if local is not None:
+            url_data, fetched_at = local
+            if time.time() - fetched_at >= self.fresh_seconds and self.breaker.allow_request():
+                self._submit_once(f"revalidate:{short_id}", self._revalidate, short_id, url_collection)
+            return url_data
+
+        if not self.breaker.allow_request():
+            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+        try:
+            return self._fetch(short_id, url_collection)
+        except HTTPException:
+            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+
+    def count_hit(self, short_id: str, url_collection) -> None:
+        """
+        Add a hit to a link.
+
+        The hit is always buffered in the local store and written to the
+        database in the background, so a slow database never delays the
+        redirect.
+
+        :param short_id: The short URL identifier.
+        :param url_collection: MongoDB collection.
+        """
+        self.store.add_hits(short_id)
+        if self.breaker.allow_request():
+            self._submit_once("flush_hits", self.flush_hits, url_collection)
+
+    def flush_hits(self, url_collection) -> None:
+        """
+        Write buffered hits until none are left or the database fails.
+
+        :param url_collection: MongoDB collection.
+        """
+        # The caller was let through by the breaker; hits counted while a
+        # round is written are picked up by the next one
+        while True:
+            _, complete = self._write_hits(self.store.pop_hits(), url_collection)
+            if not complete or not self.store.pending_hits() or not self.breaker.allow_request():
+                return
+
+    def replay_hits(self, url_collection) -> int:
+        """
+        Write the buffered hit counts to the database.
+
+        :param url_collection: MongoDB collection.
+        :return: The number of replayed hits.
+        """
+        replayed, _ = self._write_hits(self.store.pop_hits(), url_collection)
+        return replayed
+
+    def _write_hits(self, hits: Dict[str, int], url_collection) -> Tuple[int, bool]:
+        replayed = 0
+        for index, (short_id, count) in enumerate(hits.items()):
+            try:
+                increment_hit_count(short_id=short_id, url_collection=url_collection, count=count)
+            except HTTPException as e:
+                if e.status_code == 404:
+                    # Hits of a link removed since they were buffered are dropped
+                    print(f"Dropping {count} buffered hits of missing link {short_id}")
+                    continue
+                self.breaker.record_failure()
+                # Put back what was not written; it is retried after the next recovery
+                for pending_id, pending_count in list(hits.items())[index:]:
+                    self.store.add_hits(pending_id, pending_count)
+                return replayed, False
+            replayed += count
+        if hits:
+            self.breaker.record_success()
+        return replayed, True
+
+
+link_resilience = LinkResilience(
+    LOCAL_LINK_CACHE_PATH,
+    CircuitBreaker(DB_BREAKER_FAILURES, DB_BREAKER_RESET_SECONDS),
+    LOCAL_LINK_FRESH_SECONDS,
+)
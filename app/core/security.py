@@ -1,38 +1,158 @@
 import jwt
 import os
-from passlib.context import CryptContext
-from typing import Dict, Any
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Any, Optional
+from uuid import uuid4
 from dotenv import load_dotenv
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 
+from app.core.profiling import profile_stage
+from app.database.crud import add_refresh_token_to_database
+
 # Load environment variables
 load_dotenv()
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM")
-expiration_time = os.getenv("JWT_EXPIRATION_MINUTES", "0")
+expiration_time = os.getenv("JWT_EXPIRATION_MINUTES", "30")
 JWT_EXPIRATION_MINUTES = int(expiration_time)
+refresh_expiration_time = os.getenv("JWT_REFRESH_EXPIRATION_MINUTES", str(7 * 24 * 60))
+JWT_REFRESH_EXPIRATION_MINUTES = int(refresh_expiration_time)
+# Keyring as "kid:key,kid:key"; keys are secrets, or PEM private key paths for EdDSA
+JWT_KEYS = os.getenv("JWT_KEYS", "")
+JWT_ACTIVE_KID = os.getenv("JWT_ACTIVE_KID")
+# Operators allowed to use the /admin endpoints, as comma separated emails
+ADMIN_EMAILS = {
+    email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()
+}
+
+REFRESH_TOKEN_TYPE = "refresh"
+# Tokens issued before claims were slimmed carry neither exp nor sub
+REQUIRED_CLAIMS = ["exp", "iat", "sub"]
+
+
+def _load_eddsa_key(path: str):
+    """
+    Load an Ed25519/Ed448 private key from a PEM file.
+
+    Args:
+        path (str): The path of the PEM file.
+
+    Returns:
+        The private key object.
+
+    Raises:
+        EnvironmentError: If the optional cryptography package is not installed.
+    """
+    try:
+        from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    except ImportError:
+        raise EnvironmentError("JWT_ALGORITHM=EdDSA requires the cryptography package")
+
+    with open(path, "rb") as key_file:
+        return load_pem_private_key(key_file.read(), password=None)
+
+
+class Keyring:
+    """
+    Signing and verification keys by key id (kid).
+
+    Tokens are signed with the active key and carry its kid in their header;
+    any key of the ring verifies tokens, so keys can be rotated by adding a
+    new active key and removing the old one once its tokens have expired.
+    Keys are parsed once, which keeps per-request verification cheap.
+    """
+
+    def __init__(self, algorithm: str, keys: Dict[str, str], active_kid: str):
+        if active_kid not in keys:
+            raise EnvironmentError(f"JWT_ACTIVE_KID {active_kid!r} is not in the keyring")
+
+        self.algorithm = algorithm
+        self.active_kid = active_kid
+        self._signing_keys: Dict[str, Any] = {}
+        self._verification_keys: Dict[str, Any] = {}
+        for kid, key in keys.items():
+            if algorithm == "EdDSA":
+                private_key = _load_eddsa_key(key)
+                self._signing_keys[kid] = private_key
+                self._verification_keys[kid] = private_key.public_key()
+            else:
+                self._signing_keys[kid] = key
+                self._verification_keys[kid] = key
+
+    @property
+    def signing_key(self) -> Any:
+        return self._signing_keys[self.active_kid]
+
+    def verification_key(self, kid: Optional[str]) -> Any:
+        """
+        Return the key verifying tokens signed with the given kid.
+
+        Args:
+            kid (Optional[str]): The kid from the token header; tokens without
+                one are verified with the active key.
+
+        Returns:
+            The verification key.
+
+        Raises:
+            HTTPException: If the kid is not in the keyring.
+        """
+        if kid is None:
+            kid = self.active_kid
+        try:
+            return self._verification_keys[kid]
+        except KeyError:
+            raise HTTPException(status_code=401, detail="Invalid token")
+
+
+def _parse_keys(value: str) -> Dict[str, str]:
+    keys = {}
+    for entry in value.split(","):
+        if entry.strip():
+            kid, key = entry.split(":", 1)
+            keys[kid.strip()] = key.strip()
+    return keys
+
+
+def load_keyring() -> Keyring:
+    """
+    Build the keyring from JWT_KEYS, or from JWT_SECRET when it is not set.
+
+    Returns:
+        Keyring: The keyring.
+    """
+    keys = _parse_keys(JWT_KEYS) or {"default": JWT_SECRET}
+    active_kid = JWT_ACTIVE_KID or next(iter(keys))
+    return Keyring(JWT_ALGORITHM, keys, active_kid)
+
+
+keyring = load_keyring()
+
 
 def verify_jwt(jwtoken: str) -> bool:
     """
-    Verify the provided JWT token.
+    Verify the provided JWT access token.
 
     Args:
         jwtoken (str): The JWT token to verify.
 
     Returns:
-        bool: True if the token is valid, False otherwise.
+        bool: True if the token is a valid access token, False otherwise.
     """
     try:
         payload = decode_jwt_token(jwtoken)
-        return bool(payload)
+        return bool(payload) and payload.get("typ") != REFRESH_TOKEN_TYPE
     except Exception as e:
         print(f"Error verifying JWT token: {str(e)}")
         return False
 
 def decode_jwt_token(token: str) -> Dict[str, str]:
     """
-    Decode the provided JWT token.
+    Decode the provided JWT token with the keyring key matching its kid.
+
+    Tokens without an expiry, issue time or subject are rejected.
 
     Args:
         token (str): The JWT token to decode.
@@ -41,19 +161,27 @@ def decode_jwt_token(token: str) -> Dict[str, str]:
         Union[Dict[str, str]]: The decoded payload if successful.
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        kid = jwt.get_unverified_header(token).get("kid")
+        payload = jwt.decode(
+            token,
+            keyring.verification_key(kid),
+            algorithms=[keyring.algorithm],
+            options={"require": REQUIRED_CLAIMS},
+        )
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Error decoding JWT token: {str(e)}")
         raise HTTPException(status_code=401, detail="Error decoding JWT token")
 
 def encode_jwt_token(data: Dict[str, Any]) -> Dict[str, str]:
     """
-    Encode data into a JWT token.
+    Encode data into a JWT token signed with the active key.
 
     Args:
         data (Dict[str, Any]): The data to encode into the token.
@@ -62,14 +190,90 @@ def encode_jwt_token(data: Dict[str, Any]) -> Dict[str, str]:
         Union[Dict[str, str], None]: The encoded token if successful, None otherwise.
     """
     try:
-        encoded = jwt.encode(payload=data, key=JWT_SECRET, algorithm=JWT_ALGORITHM)
+        encoded = jwt.encode(
+            payload=data,
+            key=keyring.signing_key,
+            algorithm=keyring.algorithm,
+            headers={"kid": keyring.active_kid},
+        )
         return {"token": encoded}
     except Exception as e:
         print(f"Error encoding JWT token: {str(e)}")
         raise HTTPException(status_code=401, detail="Error encoding JWT token")
 
+def _token_claims(subject: str, minutes: int) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    return {"sub": subject, "iat": now, "exp": now + timedelta(minutes=minutes)}
+
+def issue_tokens(
+    subject: str, refresh_token_collection=None, family: Optional[str] = None
+) -> Dict[str, str]:
+    """
+    Issue an access token and a refresh token for a user.
+
+    The access token only carries the subject, issue and expiry times, which
+    keeps the Authorization header small. The refresh token also carries its
+    id (jti) and the family of tokens issued since the login (fam); it is
+    recorded so that it can be exchanged only once.
+
+    Args:
+        subject (str): The user email.
+        refresh_token_collection: The collection the refresh token is recorded in.
+        family (Optional[str]): The family of a refreshed session, None for a new login.
+
+    Returns:
+        Dict[str, str]: The access token as "token" and the refresh token as "refresh_token".
+    """
+    access = encode_jwt_token(_token_claims(subject, JWT_EXPIRATION_MINUTES))
+    refresh_claims = _token_claims(subject, JWT_REFRESH_EXPIRATION_MINUTES)
+    refresh_claims.update(
+        {"typ": REFRESH_TOKEN_TYPE, "jti": uuid4().hex, "fam": family or uuid4().hex}
+    )
+    refresh = encode_jwt_token(refresh_claims)
+    if refresh_token_collection is not None:
+        add_refresh_token_to_database(refresh_claims, refresh_token_collection)
+    return {"token": access["token"], "refresh_token": refresh["token"]}
+
+def decode_refresh_token(token: str) -> Dict[str, Any]:
+    """
+    Decode a refresh token.
+
+    Args:
+        token (str): The refresh token.
+
+    Returns:
+        Dict[str, Any]: The decoded payload.
+
+    Raises:
+        HTTPException: If the token is invalid, expired or not a refresh token.
+    """
+    payload = decode_jwt_token(token)
+    if payload.get("typ") != REFRESH_TOKEN_TYPE or "jti" not in payload or "fam" not in payload:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
 security = HTTPBearer()
 
+def _access_token_payload(authorization: HTTPAuthorizationCredentials) -> Dict[str, Any]:
+    """
+    Decode the access token of the authorization credentials.
+
+    Raises:
+        HTTPException: If the token is invalid or expired, or is a refresh token.
+    """
+    with profile_stage("auth"):
+        if authorization.scheme != "Bearer":
+            raise HTTPException(status_code=403, detail="Invalid authentication token")
+        try:
+            payload = decode_jwt_token(authorization.credentials)
+        except HTTPException as e:
+            print(f"Error verifying JWT token: {e.detail}")
+            payload = None
+        if not payload or payload.get("typ") == REFRESH_TOKEN_TYPE:
+            raise HTTPException(status_code=403, detail="Invalid token or expired token")
+    return payload
+
+
 def check_token_from_authorization(
     authorization: HTTPAuthorizationCredentials= Depends(security),
 ) -> bool:
@@ -85,19 +289,55 @@ def check_token_from_authorization(
     Raises:
         HTTPException: If the token is invalid or expired.
     """
-    if authorization.scheme != "Bearer":
-        raise HTTPException(status_code=403, detail="Invalid authentication token")
-    if not verify_jwt(authorization.credentials):
-        raise HTTPException(status_code=403, detail="Invalid token or expired token")
+    _access_token_payload(authorization)
+    return True
+
+
+def check_admin_from_authorization(
+    authorization: HTTPAuthorizationCredentials = Depends(security),
+) -> bool:
+    """
+    Check that the token belongs to an operator listed in ADMIN_EMAILS.
+
+    Args:
+        authorization (HTTPAuthorizationCredentials): The authorization credentials.
+
+    Returns:
+        bool: True if the token belongs to an operator.
+
+    Raises:
+        HTTPException: If the token is invalid or expired, or the user is not an operator.
+    """
+    payload = _access_token_payload(authorization)
+    if payload["sub"].lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=403, detail="Admin access required")
     return True
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_pwd_context = None
+_pwd_context_lock = Lock()
+
+
+def get_pwd_context():
+    """
+    Return the password hashing context, creating it on first use.
+
+    passlib and its bcrypt backend are only imported then, which keeps them
+    out of the startup path of workers that never check a password.
+    """
+    global _pwd_context
+    if _pwd_context is None:
+        with _pwd_context_lock:
+            if _pwd_context is None:
+                from passlib.context import CryptContext
+
+                _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
 
 
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(password: str, hashed_password: str):
-    return pwd_context.verify(password, hashed_password)
\ No newline at end of file
+    return get_pwd_context().verify(password, hashed_password)
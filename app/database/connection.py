@@ -1,6 +1,7 @@
 # MongoDB connection setup
 
 import os
+from threading import Lock
 from pymongo import MongoClient
 from pymongo.errors import OperationFailure, ConfigurationError, ConnectionFailure
 from dotenv import load_dotenv
@@ -19,6 +20,12 @@ MONGO_INITDB_DATABASE = os.getenv(DATABASE_KEY)
 MONGO_INITDB_ROOT_USERNAME = os.getenv(USERNAME_KEY)
 MONGO_INITDB_ROOT_PASSWORD = os.getenv(PASSWORD_KEY)
 MONGO_HOST = os.getenv(HOST_KEY)
+# Fail fast when MongoDB is unreachable so callers can fall back instead of hanging
+MONGO_TIMEOUT_MS = int(os.getenv("MONGO_TIMEOUT_MS", "5000"))
+# Bound each operation too, so a server that stalls without erroring cannot hold callers
+MONGO_OPERATION_TIMEOUT_MS = int(os.getenv("MONGO_OPERATION_TIMEOUT_MS", "10000"))
+# Finished background jobs are deleted this long after they finished
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
 
 
 # Validate environment variables
@@ -34,42 +41,76 @@ if not all(
         f"One or more environment variables not set: {DATABASE_KEY}, {USERNAME_KEY}, {PASSWORD_KEY}, {HOST_KEY}"
     )
 
-try:
+_db = None
+_db_lock = Lock()
+
+
+def _connect():
+    """
+    Create the MongoDB client and the indexes of the collections.
+
+    Called on first use rather than at import, so importing the app neither
+    waits for MongoDB nor fails while it is unreachable.
+    """
     # Create MongoDB client
     client = MongoClient(
         host=MONGO_HOST,
         port=27017,
         username=MONGO_INITDB_ROOT_USERNAME,
         password=MONGO_INITDB_ROOT_PASSWORD,
+        serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_OPERATION_TIMEOUT_MS,
     )
 
     # Access the specified database
     db = client[MONGO_INITDB_DATABASE]
 
-    # Define collections
-    user_collection = db["users"]
-    url_collection = db["urls"]
+    try:
+        # Create unique index on fields in collections
+        db["users"].create_index([("email", 1)], unique=True)
+        # urls and url_hashes are only ever queried by _id (see app/database/schema.py)
+        db["jobs"].create_index([("status", 1)])
+        db["jobs"].create_index([("finished_at", 1)], expireAfterSeconds=JOB_RETENTION_SECONDS)
+        # Refresh tokens are kept until they expire, to detect their reuse
+        db["refresh_tokens"].create_index([("family", 1)])
+        db["refresh_tokens"].create_index([("expires_at", 1)], expireAfterSeconds=0)
 
-    # Create unique index on fields in collections
-    user_collection.create_index([("email", 1)], unique=True)
-    url_collection.create_index([("original_url", 1)], unique=True)
+    except ConnectionFailure as e:
+        print(f"Failed to connect to MongoDB: {e}")
+    except OperationFailure as e:
+        print(f"MongoDB operation failed: {e}")
+    except ConfigurationError as e:
+        print(f"MongoDB configuration error: {e}")
+    except Exception as e:
+        print(f"An unexpected error occurred: {e}")
+    return db
 
-except ConnectionFailure as e:
-    print(f"Failed to connect to MongoDB: {e}")
-except OperationFailure as e:
-    print(f"MongoDB operation failed: {e}")
-except ConfigurationError as e:
-    print(f"MongoDB configuration error: {e}")
-except Exception as e:
-    print(f"An unexpected error occurred: {e}")
 
 # Dependency injection functions
 def get_db():
-    return db
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = _connect()
+    return _db
 
 
 def get_user_collection():
-    return user_collection
+    return get_db()["users"]
 
 def get_url_collection():
-    return url_collection
+    return get_db()["urls"]
+
+def get_url_hash_collection():
+    return get_db()["url_hashes"]
+
+def get_domain_collection():
+    return get_db()["domains"]
+
+def get_job_collection():
+    return get_db()["jobs"]
+
+def get_refresh_token_collection():
+    return get_db()["refresh_tokens"]
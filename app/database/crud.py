@@ -1,6 +1,30 @@
+import time
+
 from fastapi import HTTPException
-from pymongo.errors import DuplicateKeyError
-from typing import Dict, Any, Union, Literal
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from typing import Dict, Any, Iterator, List, Optional, Union, Literal
+
+from app.database.schema import (
+    URL_ID,
+    URL_HIT_COUNT,
+    URL_DOMAIN,
+    URL_HASH_SHORT_ID,
+    URL_HASH_CLAIMED_AT,
+    URL_HASH_LEASE_SECONDS,
+    URL_METADATA_FIELDS,
+    compact_url_document,
+    expand_url_document,
+    url_hash,
+)
+
+
+class ShortIdTakenError(HTTPException):
+    """
+    Raised when the short id of a new url already belongs to another url.
+    """
+
+    def __init__(self):
+        super().__init__(status_code=409, detail="Short ID already taken.")
 
 
 def add_user_to_database(user: Dict[str, str], user_collection) -> Dict[str, str]:
@@ -49,43 +73,186 @@ def get_user_from_database(email: str, user_collection) -> Dict[str, Any]:
     return user
 
 
-def add_url_to_database(url_data: Dict[str, str], url_collection) -> Dict[str, str]:
+def _url_hash_document(hash_id: str, short_id: str) -> Dict[str, Any]:
+    return {URL_ID: hash_id, URL_HASH_SHORT_ID: short_id, URL_HASH_CLAIMED_AT: time.time()}
+
+
+def _claim_url_hash(hash_id: str, short_id: str, url_collection, url_hash_collection) -> None:
     """
-    Adds a url to the database.
+    Claims a (domain, original URL) hash for a short id.
+
+    A hash left behind by an insert that never completed, whose short id
+    still has no url once the claim lease has expired, is taken over. A
+    recent claim without a url belongs to an insert in flight and is kept.
+
+    Raises:
+        DuplicateKeyError: If the hash belongs to an existing or in-flight url.
+    """
+    try:
+        url_hash_collection.insert_one(_url_hash_document(hash_id, short_id))
+    except DuplicateKeyError:
+        existing = url_hash_collection.find_one({URL_ID: hash_id})
+        claimed_at = existing.get(URL_HASH_CLAIMED_AT) if existing else None
+        expired = (claimed_at or 0) < time.time() - URL_HASH_LEASE_SECONDS
+        if existing and expired and not url_collection.find_one(
+            {URL_ID: existing[URL_HASH_SHORT_ID]}, {URL_ID: 1}
+        ):
+            result = url_hash_collection.update_one(
+                {
+                    URL_ID: hash_id,
+                    URL_HASH_SHORT_ID: existing[URL_HASH_SHORT_ID],
+                    URL_HASH_CLAIMED_AT: claimed_at,
+                },
+                {"$set": {URL_HASH_SHORT_ID: short_id, URL_HASH_CLAIMED_AT: time.time()}},
+            )
+            if result.modified_count:
+                return
+        raise
+
+
+def add_url_to_database(
+    url_data: Dict[str, Any], url_collection, url_hash_collection
+) -> Dict[str, Any]:
+    """
+    Adds a url to the database, stored as a compact document.
+
+    Uniqueness of the original URL per domain is enforced by the url_hashes
+    collection rather than by an index on urls, so both collections stay
+    shardable on their _id.
 
     Args:
-        url (str): The url data to add.
+        url_data (Dict[str, Any]): The url data to add.
 
     Returns:
-        Dict[str, str]: A success message.
+        Dict[str, Any]: The added url data.
 
     Raises:
-        HTTPException: If there is an error adding the url.
+        ShortIdTakenError: If the short id belongs to another url.
+        HTTPException: If the URL already exists or there is an error adding the url.
     """
+    hash_id = url_hash(url_data["original_url"], url_data.get("domain"))
     try:
-        url_collection.insert_one(url_data)
+        _claim_url_hash(hash_id, url_data["short_id"], url_collection, url_hash_collection)
     except DuplicateKeyError:
         raise HTTPException(status_code=409, detail="URL already exists.")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error adding URL: {str(e)}")
 
-    return {
-        "short_url": url_data["short_url"],
-        "qr_code": url_data["qr_url"],
-        "hit_count": url_data["hit_count"],
-        "short_id": url_data["short_id"],
-    }
+    try:
+        url_collection.insert_one(compact_url_document(url_data))
+    except Exception as e:
+        # Release the hash so the URL can be shortened again
+        url_hash_collection.delete_one({URL_ID: hash_id, URL_HASH_SHORT_ID: url_data["short_id"]})
+        # The hash was claimed above, so a duplicate _id is a short id collision
+        if isinstance(e, DuplicateKeyError):
+            raise ShortIdTakenError()
+        raise HTTPException(status_code=400, detail=f"Error adding URL: {str(e)}")
+
+    return url_data
+
+
+def _insert_many_ignoring_duplicates(collection, documents: List[Dict[str, Any]]) -> List[int]:
+    """
+    Inserts documents in one unordered bulk write.
+
+    Returns:
+        List[int]: The indexes of the documents rejected as duplicates.
+    """
+    if not documents:
+        return []
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details["writeErrors"]
+        if any(error["code"] != 11000 for error in errors):
+            raise
+        return [error["index"] for error in errors]
+    return []
+
+
+def add_urls_to_database(
+    urls: List[Dict[str, Any]], url_collection, url_hash_collection
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Adds a batch of urls with one bulk write per collection.
+
+    The uniqueness rule of add_url_to_database applies: a url whose original
+    URL already exists in its domain, in the database or earlier in the
+    batch, is not added.
+
+    Args:
+        urls (List[Dict[str, Any]]): The url data to add.
+
+    Returns:
+        Dict[str, List[Dict[str, Any]]]: The added url data under "added", the
+            urls whose original URL already exists under "existing", and the
+            urls whose short id is already taken under "conflicts".
+
+    Raises:
+        HTTPException: If there is an error adding the urls.
+    """
+    claims: Dict[str, Dict[str, Any]] = {}
+    existing = []
+    for url_data in urls:
+        hash_id = url_hash(url_data["original_url"], url_data.get("domain"))
+        if hash_id in claims:
+            existing.append(url_data)
+        else:
+            claims[hash_id] = url_data
+    hash_ids = list(claims)
+
+    try:
+        taken = [
+            hash_ids[index]
+            for index in _insert_many_ignoring_duplicates(
+                url_hash_collection,
+                [_url_hash_document(hash_id, claims[hash_id]["short_id"]) for hash_id in hash_ids],
+            )
+        ]
+        for hash_id in taken:
+            # Hashes of existing urls are rare outside of re-imports, so the
+            # orphan takeover is done one by one
+            try:
+                _claim_url_hash(hash_id, claims[hash_id]["short_id"], url_collection, url_hash_collection)
+            except DuplicateKeyError:
+                existing.append(claims.pop(hash_id))
+
+        hash_ids = list(claims)
+        conflicts = [
+            claims.pop(hash_ids[index])
+            for index in _insert_many_ignoring_duplicates(
+                url_collection, [compact_url_document(claims[hash_id]) for hash_id in hash_ids]
+            )
+        ]
+        # Release the hashes of urls whose short id is taken
+        for url_data in conflicts:
+            url_hash_collection.delete_one(
+                {
+                    URL_ID: url_hash(url_data["original_url"], url_data.get("domain")),
+                    URL_HASH_SHORT_ID: url_data["short_id"],
+                }
+            )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error adding urls: {str(e)}")
+
+    return {"added": list(claims.values()), "existing": existing, "conflicts": conflicts}
 
 
 def get_url_from_database(
     input: Union[Dict[Literal["original_url"], str], Dict[Literal["short_id"], str]],
     url_collection,
+    domain: Optional[str] = None,
+    url_hash_collection=None,
 ) -> Dict[str, Any]:
     """
     Retrieves a url from the database by original_url or short_id.
 
+    Both lookups are by _id, so each one targets a single shard.
+
     Args:
         input Dict[original_url, str] or Dict[short_id, str]: The field which search by in url collection and its value.
+        domain (Optional[str]): The domain an original_url is searched in, None for the default domain.
+        url_hash_collection: The url_hashes collection, required to search by original_url.
 
     Returns:
         Dict[str, Any]: The url data.
@@ -95,24 +262,116 @@ def get_url_from_database(
     """
     try:
         if "original_url" in input:
-            url = url_collection.find_one({"original_url": input["original_url"]})
+            url = None
+            url_hash_document = url_hash_collection.find_one(
+                {URL_ID: url_hash(input["original_url"], domain)}
+            )
+            if url_hash_document:
+                url = url_collection.find_one({URL_ID: url_hash_document[URL_HASH_SHORT_ID]})
         elif "short_id" in input:
-            url = url_collection.find_one({"short_id": input["short_id"]})
+            url = url_collection.find_one({URL_ID: input["short_id"]})
         else:
             raise HTTPException(status_code=404, detail="incorrect input.")
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error retrieving url: {str(e)}")
 
-    return url
+    return expand_url_document(url)
+
+
+def iter_urls_from_database(
+    url_collection,
+    short_ids: Optional[List[str]] = None,
+    domain: Optional[str] = None,
+    batch_size: int = 500,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Iterates over urls by short_id, or over all urls of a domain.
+
+    Listing a domain is not keyed by _id and is broadcast to every shard, so
+    it is only meant for bulk operations such as exports.
+
+    Args:
+        short_ids (Optional[List[str]]): The short ids to retrieve; if None all urls of the domain are returned.
+        domain (Optional[str]): The domain to list when no short ids are given, None for the default domain.
+        batch_size (int): Number of documents fetched per round trip.
+
+    Returns:
+        Iterator[Dict[str, Any]]: The url data, read lazily from the cursor.
+
+    Raises:
+        HTTPException: If there is an error querying the urls.
+    """
+    if short_ids is not None:
+        query = {URL_ID: {"$in": short_ids}}
+    else:
+        query = {URL_DOMAIN: domain}
+    try:
+        cursor = url_collection.find(query).batch_size(batch_size)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error retrieving urls: {str(e)}")
+
+    return (expand_url_document(document) for document in cursor)
+
+
+def count_urls_in_domain(url_collection, domain: Optional[str], limit: int = 0) -> int:
+    """
+    Counts the urls of a domain, stopping at limit if given.
+
+    Args:
+        domain (Optional[str]): The domain, None for the default domain.
+        limit (int): Maximum number of urls counted, 0 for no limit.
+
+    Returns:
+        int: The number of urls, at most limit.
+
+    Raises:
+        HTTPException: If there is an error counting the urls.
+    """
+    try:
+        return url_collection.count_documents({URL_DOMAIN: domain}, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error counting urls: {str(e)}")
+
+
+def iter_url_batches(
+    url_collection, after_id: Optional[str] = None, batch_size: int = 1000
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Iterates over all urls in short id order, one batch at a time.
+
+    Each batch is a range query on _id, so an interrupted iteration can be
+    resumed after the last short id it returned.
+
+    Args:
+        after_id (Optional[str]): Only urls with a greater short id are returned.
+        batch_size (int): Number of urls per batch.
+
+    Returns:
+        Iterator[List[Dict[str, Any]]]: Batches of url data.
+
+    Raises:
+        HTTPException: If there is an error querying the urls.
+    """
+    while True:
+        query = {URL_ID: {"$gt": after_id}} if after_id is not None else {}
+        try:
+            documents = list(url_collection.find(query).sort(URL_ID, 1).limit(batch_size))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Error retrieving urls: {str(e)}")
+        if not documents:
+            return
+        yield [expand_url_document(document) for document in documents]
+        after_id = documents[-1][URL_ID]
 
 
-def increment_hit_count(short_id: str, url_collection) -> None:
+def increment_hit_count(short_id: str, url_collection, count: int = 1) -> None:
     """
     Adds a url to the database.
 
     Args:
         short_id (str): The shord id of url to increment the hit count.
+        count (int): The number of hits to add.
 
     Returns:
         None
@@ -123,10 +382,154 @@ def increment_hit_count(short_id: str, url_collection) -> None:
     try:
         # Update the document
         result = url_collection.update_one(
-            {"short_id": short_id}, {"$inc": {"hit_count": 1}}
+            {URL_ID: short_id}, {"$inc": {URL_HIT_COUNT: count}}
         )
         # Check if the update was successful
         if not result.modified_count > 0:
             raise HTTPException(status_code=404, detail="increment hit rate failed!")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error adding url: {str(e)}")
+
+
+def update_url_metadata(short_id: str, metadata: Dict[str, Any], url_collection) -> None:
+    """
+    Stores the results of background link checks on a url.
+
+    Args:
+        short_id (str): The short id of the url to update.
+        metadata (Dict[str, Any]): The reachable, flagged and/or title values to set.
+
+    Returns:
+        None
+
+    Raises:
+        HTTPException: If the url is not found or there is an error updating it.
+    """
+    fields = {URL_METADATA_FIELDS[key]: value for key, value in metadata.items()}
+    try:
+        result = url_collection.update_one({URL_ID: short_id}, {"$set": fields})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error updating url: {str(e)}")
+    if result.matched_count == 0:
+        raise HTTPException(status_code=404, detail="URL not found.")
+
+
+def add_domain_to_database(domain: Dict[str, str], domain_collection) -> Dict[str, str]:
+    """
+    Adds a short domain to the database.
+
+    Args:
+        domain (Dict[str, str]): The domain host and base_url to add.
+
+    Returns:
+        Dict[str, str]: A success message.
+
+    Raises:
+        HTTPException: If the domain already exists or there is an error adding the domain.
+    """
+    try:
+        domain_collection.insert_one({"_id": domain["host"], "base_url": domain["base_url"]})
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Domain already exists.")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error adding domain: {str(e)}")
+
+    return {"detail": "Domain added to the database successfully."}
+
+
+def get_domains_from_database(domain_collection) -> List[Dict[str, str]]:
+    """
+    Retrieves all short domains from the database.
+
+    Returns:
+        List[Dict[str, str]]: The domains with their host and base_url.
+
+    Raises:
+        HTTPException: If there is an error retrieving the domains.
+    """
+    try:
+        return [
+            {"host": domain["_id"], "base_url": domain["base_url"]}
+            for domain in domain_collection.find({})
+        ]
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error retrieving domains: {str(e)}")
+
+
+def add_refresh_token_to_database(token: Dict[str, Any], refresh_token_collection) -> None:
+    """
+    Records an issued refresh token so that it can be exchanged only once.
+
+    Args:
+        token (Dict[str, Any]): The jti, family, subject and expiry (exp) of the token.
+
+    Returns:
+        None
+
+    Raises:
+        HTTPException: If there is an error adding the token.
+    """
+    try:
+        refresh_token_collection.insert_one(
+            {
+                "_id": token["jti"],
+                "family": token["fam"],
+                "sub": token["sub"],
+                "expires_at": token["exp"],
+                "used": False,
+                "revoked": False,
+            }
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error adding refresh token: {str(e)}")
+
+
+def use_refresh_token(jti: str, family: str, refresh_token_collection) -> bool:
+    """
+    Marks a refresh token as used.
+
+    A token that is unknown, already used or revoked has leaked or been
+    replayed, so every token of its family is revoked: the session ends for
+    both the user and whoever holds the copy.
+
+    Args:
+        jti (str): The id of the refresh token.
+        family (str): The family of tokens issued from the same login.
+
+    Returns:
+        bool: True if the token was valid and is now used.
+
+    Raises:
+        HTTPException: If there is an error updating the tokens.
+    """
+    try:
+        token = refresh_token_collection.find_one_and_update(
+            {"_id": jti, "used": False, "revoked": False}, {"$set": {"used": True}}
+        )
+        if token is not None:
+            return True
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error using refresh token: {str(e)}")
+    revoke_refresh_tokens(family, refresh_token_collection)
+    return False
+
+
+def revoke_refresh_tokens(family: str, refresh_token_collection) -> None:
+    """
+    Revokes every refresh token of a family.
+
+    Args:
+        family (str): The family of tokens issued from the same login.
+
+    Returns:
+        None
+
+    Raises:
+        HTTPException: If there is an error updating the tokens.
+    """
+    try:
+        refresh_token_collection.update_many({"family": family}, {"$set": {"revoked": True}})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Error revoking refresh tokens: {str(e)}")
@@ -0,0 +1,109 @@
+# On-disk store of last-known link mappings and of hit counts not yet
+# written to MongoDB, so redirects keep working through database outages.
+
+import json
+import sqlite3
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+
+class LocalLinkStore:
+    """
+    SQLite-backed store of url data by short id and of buffered hit counts.
+
+    At most ``max_links`` mappings are kept; the least recently fetched ones
+    are evicted every ``prune_every`` writes. Buffered hits are never evicted.
+    """
+
+    def __init__(self, path: str, max_links: int = 100000, prune_every: int = 1000):
+        self.path = path
+        self.max_links = max_links
+        self.prune_every = prune_every
+        self._puts = 0
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS links ("
+            "short_id TEXT PRIMARY KEY, data TEXT NOT NULL, fetched_at REAL NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS links_fetched_at ON links (fetched_at)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pending_hits ("
+            "short_id TEXT PRIMARY KEY, count INTEGER NOT NULL)"
+        )
+        self.prune()
+
+    def get(self, short_id: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Return the stored url data of a short id and when it was fetched.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT data, fetched_at FROM links WHERE short_id = ?", (short_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def put(self, url_data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO links (short_id, data, fetched_at) VALUES (?, ?, ?)",
+                (url_data["short_id"], json.dumps(url_data), time.time()),
+            )
+            self._puts += 1
+            due = self._puts % self.prune_every == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """
+        Evict the least recently fetched mappings beyond ``max_links``.
+
+        Returns:
+            int: The number of evicted mappings.
+        """
+        with self._lock:
+            cursor = self._connection.execute(
+                "DELETE FROM links WHERE short_id IN ("
+                "SELECT short_id FROM links ORDER BY fetched_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_links,),
+            )
+        return cursor.rowcount
+
+    def delete(self, short_id: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM links WHERE short_id = ?", (short_id,))
+
+    def add_hits(self, short_id: str, count: int = 1) -> None:
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO pending_hits (short_id, count) VALUES (?, ?) "
+                "ON CONFLICT(short_id) DO UPDATE SET count = count + excluded.count",
+                (short_id, count),
+            )
+
+    def pop_hits(self) -> Dict[str, int]:
+        """
+        Remove and return all buffered hit counts.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                hits = dict(self._connection.execute("SELECT short_id, count FROM pending_hits"))
+                self._connection.execute("DELETE FROM pending_hits")
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+        return hits
+
+    def pending_hits(self) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT COALESCE(SUM(count), 0) FROM pending_hits").fetchone()
+        return row[0]
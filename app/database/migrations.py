@@ -0,0 +1,159 @@
+# Data migrations for the urls collection
+#
+# Run from the project root before starting a new release:
+#     python -m app.database.migrations --batch-size 1000
+# Add --shard to also shard the urls and url_hashes collections.
+
+import argparse
+
+from pymongo.errors import BulkWriteError
+
+from app.database.schema import (
+    URL_DOMAIN,
+    URL_HASH_SHORT_ID,
+    URL_ID,
+    URL_ORIGINAL,
+    compact_url_document,
+    url_hash,
+)
+
+# Unique indexes of earlier releases on the original URL; uniqueness is now
+# enforced by the url_hashes collection
+LEGACY_URL_INDEXES = ["original_url_1", "u_1", "d_1_u_1"]
+
+# Collections sharded on a hashed _id
+SHARDED_COLLECTIONS = ["urls", "url_hashes"]
+
+
+def _insert_ignoring_duplicates(collection, documents) -> None:
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Documents already written by an interrupted run are kept as is
+        if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+            raise
+
+
+def migrate_urls_to_compact_schema(url_collection, batch_size: int = 1000) -> int:
+    """
+    Rewrite legacy url documents to the compact schema in batches.
+
+    Legacy documents carry ``short_id``, ``short_url``, ``qr_url`` and
+    ``qr_code``; each one is replaced by a compact document keyed by its
+    short ID. The migration can be interrupted and re-run safely.
+
+    Args:
+        url_collection: The urls collection to migrate.
+        batch_size (int): Number of documents rewritten per bulk write.
+
+    Returns:
+        int: The number of migrated documents.
+    """
+    # Compact documents have no "original_url", so the legacy unique index
+    # would reject every one after the first, and unique indexes not prefixed
+    # by the shard key prevent sharding
+    existing_indexes = url_collection.index_information()
+    for index in LEGACY_URL_INDEXES:
+        if index in existing_indexes:
+            url_collection.drop_index(index)
+
+    migrated = 0
+    last_id = None
+    while True:
+        query = {"short_id": {"$exists": True}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(url_collection.find(query).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+
+        _insert_ignoring_duplicates(
+            url_collection, [compact_url_document(document) for document in batch]
+        )
+        url_collection.delete_many({"_id": {"$in": [doc["_id"] for doc in batch]}})
+
+        migrated += len(batch)
+        last_id = batch[-1]["_id"]
+        print(f"Migrated {migrated} url documents")
+
+    return migrated
+
+
+def backfill_url_hashes(url_collection, url_hash_collection, batch_size: int = 1000) -> int:
+    """
+    Create the url_hashes documents used to dedupe original URLs per domain.
+
+    Args:
+        url_collection: The urls collection, already in the compact schema.
+        url_hash_collection: The url_hashes collection to fill.
+        batch_size (int): Number of documents written per bulk write.
+
+    Returns:
+        int: The number of urls processed.
+    """
+    processed = 0
+    last_id = None
+    while True:
+        query = {} if last_id is None else {URL_ID: {"$gt": last_id}}
+        batch = list(
+            url_collection.find(query, {URL_ORIGINAL: 1, URL_DOMAIN: 1})
+            .sort(URL_ID, 1)
+            .limit(batch_size)
+        )
+        if not batch:
+            break
+
+        _insert_ignoring_duplicates(
+            url_hash_collection,
+            [
+                {
+                    URL_ID: url_hash(document[URL_ORIGINAL], document.get(URL_DOMAIN)),
+                    URL_HASH_SHORT_ID: document[URL_ID],
+                }
+                for document in batch
+            ],
+        )
+
+        processed += len(batch)
+        last_id = batch[-1][URL_ID]
+        print(f"Hashed {processed} url documents")
+
+    return processed
+
+
+def shard_collections(client, database_name: str) -> None:
+    """
+    Shard the urls and url_hashes collections on a hashed _id.
+
+    Every query on these collections is by _id, so redirects and dedupe
+    lookups are routed to a single shard at any cluster size.
+
+    Args:
+        client: A MongoClient connected to a mongos router.
+        database_name (str): The database holding the collections.
+    """
+    client.admin.command("enableSharding", database_name)
+    for collection in SHARDED_COLLECTIONS:
+        # Collections that already hold data can only be sharded on an existing index
+        client[database_name][collection].create_index([(URL_ID, "hashed")])
+        client.admin.command(
+            "shardCollection", f"{database_name}.{collection}", key={URL_ID: "hashed"}
+        )
+        print(f"Sharded {database_name}.{collection}")
+
+
+if __name__ == "__main__":
+    from app.database.connection import get_db, get_url_collection, get_url_hash_collection
+
+    parser = argparse.ArgumentParser(description="Migrate the urls collection.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--shard", action="store_true", help="shard urls and url_hashes on a hashed _id")
+    args = parser.parse_args()
+
+    total = migrate_urls_to_compact_schema(get_url_collection(), args.batch_size)
+    print(f"Done, {total} url documents migrated")
+    total = backfill_url_hashes(get_url_collection(), get_url_hash_collection(), args.batch_size)
+    print(f"Done, {total} url documents hashed")
+    if args.shard:
+        db = get_db()
+        shard_collections(db.client, db.name)
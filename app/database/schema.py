@@ -0,0 +1,99 @@
+# Compact document layout of the urls collection
+#
+# Stored documents only keep what cannot be derived: the short id is the
+# document _id, and the short URL, QR URL and QR file path are computed from
+# it when a response is built.
+#
+# Both urls and url_hashes are keyed (and sharded) by a hashed _id, so every
+# lookup by short id or by original URL targets a single shard.
+
+import hashlib
+from typing import Any, Dict, Optional
+
+URL_ID = "_id"
+URL_ORIGINAL = "u"
+URL_HIT_COUNT = "h"
+# Host of the branded domain the link belongs to, absent for the default domain
+URL_DOMAIN = "d"
+# Results of the background link checks, absent until they have run
+URL_REACHABLE = "r"
+URL_FLAGGED = "f"
+URL_TITLE = "t"
+
+# url_hashes documents map a hash of (domain, original URL) to the short id
+URL_HASH_SHORT_ID = "s"
+# Time the hash was claimed, in seconds since the epoch
+URL_HASH_CLAIMED_AT = "c"
+# A claimed hash whose url is still missing after this long is an orphan left
+# by an insert that never completed; before that, the insert may be in flight
+URL_HASH_LEASE_SECONDS = 60
+
+# Url data keys of the link check results and their stored field names
+URL_METADATA_FIELDS = {
+    "reachable": URL_REACHABLE,
+    "flagged": URL_FLAGGED,
+    "title": URL_TITLE,
+}
+
+
+def compact_url_document(url_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert url data to the document stored in the urls collection.
+
+    Args:
+        url_data (Dict[str, Any]): The url data with original_url, short_id, hit_count and domain,
+            and optionally the link check results.
+
+    Returns:
+        Dict[str, Any]: The compact document.
+    """
+    document = {
+        URL_ID: url_data["short_id"],
+        URL_ORIGINAL: url_data["original_url"],
+        URL_HIT_COUNT: url_data.get("hit_count", 0),
+    }
+    if url_data.get("domain"):
+        document[URL_DOMAIN] = url_data["domain"]
+    # Link check results are only stored once known, as update_url_metadata does
+    for key, field in URL_METADATA_FIELDS.items():
+        if url_data.get(key) is not None:
+            document[field] = url_data[key]
+    return document
+
+
+def expand_url_document(document: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Convert a stored compact document back to url data.
+
+    Args:
+        document (Optional[Dict[str, Any]]): The document read from the urls collection.
+
+    Returns:
+        Optional[Dict[str, Any]]: The url data, or None if no document was given.
+    """
+    if document is None:
+        return None
+    return {
+        "short_id": document[URL_ID],
+        "original_url": document[URL_ORIGINAL],
+        "hit_count": document.get(URL_HIT_COUNT, 0),
+        "domain": document.get(URL_DOMAIN),
+        "reachable": document.get(URL_REACHABLE),
+        "flagged": document.get(URL_FLAGGED, False),
+        "title": document.get(URL_TITLE),
+    }
+
+
+def url_hash(original_url: str, domain: Optional[str] = None) -> str:
+    """
+    Return the key of a (domain, original URL) pair in the url_hashes collection.
+
+    Args:
+        original_url (str): The original URL.
+        domain (Optional[str]): The domain of the link, None for the default domain.
+
+    Returns:
+        str: A 128-bit hex digest.
+    """
+    key = f"{domain or ''}\x00{original_url}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=16).hexdigest()
@@ -1,12 +1,57 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 import os
 
+from app.core.profiling import PROFILING_ENABLED, ProfiledJSONResponse, ProfilingMiddleware
+from app.routes.admin import router as admin_router
 from app.routes.auth import router as auth_router
 from app.routes.shorten_url import router as shorten_router
+from app.core.jobs import JobQueue, run_in_background
+from app.core.hot_links import HOT_LINKS_PREWARM, HOT_LINKS_SNAPSHOT, link_cache
+from app.database.connection import get_job_collection, get_url_collection
 
 
-app = FastAPI(title="Link Shortener API", version="1.0.0")
+def warm_up() -> None:
+    """
+    Resume unfinished background jobs and pin the links that were hot before the restart.
+
+    Both talk to MongoDB, so they run in the background instead of delaying startup.
+    """
+    # Pick up background jobs left unfinished by a previous process
+    try:
+        JobQueue(get_job_collection(), get_url_collection()).resume()
+    except Exception as e:
+        print(f"Error resuming background jobs: {str(e)}")
+
+    # Pin the links that were hot before the restart
+    if HOT_LINKS_PREWARM:
+        try:
+            link_cache.prewarm(HOT_LINKS_SNAPSHOT, get_url_collection())
+        except Exception as e:
+            print(f"Error pre-warming hot links: {str(e)}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.warm_up = run_in_background(warm_up)
+    yield
+
+    if HOT_LINKS_PREWARM:
+        try:
+            link_cache.save_snapshot(HOT_LINKS_SNAPSHOT)
+        except Exception as e:
+            print(f"Error saving hot links: {str(e)}")
+
+
+app = FastAPI(
+    title="Link Shortener API",
+    version="1.0.0",
+    lifespan=lifespan,
+    # Times the serialization stage of profiled endpoints
+    default_response_class=ProfiledJSONResponse if PROFILING_ENABLED else JSONResponse,
+)
 
 # CORS middleware configuration
 origins = [
@@ -21,6 +66,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request profiling is opt-in so it costs nothing when disabled
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
 
 # Auth routes
 app.include_router(
@@ -30,6 +79,9 @@ app.include_router(
 # Shorten URL routes
 app.include_router(shorten_router, tags=["Link Shortener"], prefix="/shorten")
 
+# Admin routes
+app.include_router(admin_router, tags=["Admin"], prefix="/admin")
+
 
 # Health check endpoint
 @app.get("/healthchecker")
@@ -35,3 +35,13 @@ class RegisterEntity(LoginEntity):
         }
         # Optionally, you can enable/disable the strict mode
         extra = "forbid"  # This will raise an error if unknown fields are passed
+
+
+class RefreshEntity(BaseModel):
+    """
+    Represents the refresh entity with the refresh token issued at login.
+    """
+    refresh_token: str
+
+    class Config:
+        extra = "forbid"  # This will raise an error if unknown fields are passed
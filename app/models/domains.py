@@ -0,0 +1,27 @@
+from pydantic import BaseModel, HttpUrl, constr, model_validator
+
+from app.core.domains import normalize_host
+
+
+class Domain(BaseModel):
+    """
+    Represents a branded short domain and the base URL of its short links.
+    """
+    host: constr(min_length=1)
+    base_url: HttpUrl
+
+    @model_validator(mode="after")
+    def check_base_url_host(self):
+        # Redirects are matched on the Host header, so links must point at the domain itself
+        if self.base_url.host != normalize_host(self.host):
+            raise ValueError("base_url must be on the domain host")
+        return self
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "host": "go.example.com",
+                "base_url": "https://go.example.com/shorten"
+            }
+        }
+        extra = "forbid"
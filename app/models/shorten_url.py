@@ -1,6 +1,23 @@
-from pydantic import BaseModel, HttpUrl
+from pydantic import BaseModel, HttpUrl, model_validator
+from typing import List, Optional
 
 
 # URL Model
 class URL(BaseModel):
     original_url: HttpUrl
+    # Short domain host of the link, defaults to the domain of the request
+    domain: Optional[str] = None
+
+
+# QR Export Model
+class QRExport(BaseModel):
+    # Short IDs to export
+    short_ids: Optional[List[str]] = None
+    # Or the short domain host whose links are exported, the default domain's host included
+    domain: Optional[str] = None
+
+    @model_validator(mode="after")
+    def check_one_selection(self):
+        if (self.short_ids is None) == (self.domain is None):
+            raise ValueError("Give either short_ids or domain")
+        return self
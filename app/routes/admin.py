@@ -0,0 +1,162 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from pymongo import MongoClient
+
+from app.core.domains import domain_registry, normalize_host
+from app.core.hot_links import HOT_LINKS_SNAPSHOT, link_cache
+from app.core.profiling import (
+    PROFILING_ENABLED,
+    dump_profile,
+    get_slow_requests,
+    reset_profile,
+)
+from app.core.security import check_admin_from_authorization
+from app.database.connection import get_domain_collection, get_url_collection
+from app.database.crud import add_domain_to_database
+from app.models.domains import Domain
+
+router = APIRouter()
+
+
+@router.get("/profile")
+def get_profile(
+    limit: int = 50,
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Dump the aggregated profile of sampled requests as flame-graph data.
+
+    :param limit: Maximum number of functions to return.
+    :param authorized: Admin authorization check.
+    :return: A dictionary with the sample count, top functions and collapsed stacks.
+    """
+    return {"enabled": PROFILING_ENABLED, **dump_profile(limit=limit)}
+
+
+@router.delete("/profile")
+def clear_profile(
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Reset the aggregated profile and the slow-request log.
+
+    :param authorized: Admin authorization check.
+    :return: A confirmation message.
+    """
+    reset_profile()
+    return {"detail": "Profile data cleared."}
+
+
+@router.get("/slow-requests")
+def slow_requests(
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Return the most recent slow requests with their stage breakdown.
+
+    :param authorized: Admin authorization check.
+    :return: A dictionary with the slow-request entries.
+    """
+    return {"enabled": PROFILING_ENABLED, "slow_requests": get_slow_requests()}
+
+
+@router.get("/domains")
+def list_domains(
+    domain_collection: MongoClient = Depends(get_domain_collection),
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    List the short domains currently loaded in the domain table.
+
+    :param domain_collection: MongoDB domains collection dependency.
+    :param authorized: Admin authorization check.
+    :return: A dictionary with the default base URL and the registered domains.
+    """
+    domain_registry.ensure_loaded(domain_collection)
+    return {
+        "default_base_url": domain_registry.default_base_url,
+        "domains": domain_registry.domains(),
+    }
+
+
+@router.post("/domains", status_code=status.HTTP_201_CREATED)
+def register_domain(
+    payload: Domain,
+    domain_collection: MongoClient = Depends(get_domain_collection),
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Register a short domain and reload the domain table.
+
+    :param payload: The domain host and the base URL of its short links.
+    :param domain_collection: MongoDB domains collection dependency.
+    :param authorized: Admin authorization check.
+    :return: Confirmation message if registration is successful.
+    """
+    response = add_domain_to_database(
+        domain={"host": normalize_host(payload.host), "base_url": str(payload.base_url)},
+        domain_collection=domain_collection,
+    )
+    domain_registry.load(domain_collection)
+    return response
+
+
+@router.post("/domains/reload")
+def reload_domains(
+    domain_collection: MongoClient = Depends(get_domain_collection),
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Reload the domain table from the database without a restart.
+
+    :param domain_collection: MongoDB domains collection dependency.
+    :param authorized: Admin authorization check.
+    :return: The number of loaded domains.
+    """
+    return {"domains": domain_registry.load(domain_collection)}
+
+
+@router.get("/hot-links")
+def hot_links(
+    limit: int = 100,
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    List the most redirected short links tracked by this process.
+
+    :param limit: Maximum number of links to return.
+    :param authorized: Admin authorization check.
+    :return: A dictionary with the hot links, their estimated hits and pinning.
+    """
+    return {"hot_links": link_cache.hot_links(limit=limit)}
+
+
+@router.post("/hot-links/snapshot")
+def snapshot_hot_links(
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Save the hot links so the cache can be pre-warmed from them at startup.
+
+    :param authorized: Admin authorization check.
+    :return: The snapshot path and the number of saved links.
+    """
+    return {"path": HOT_LINKS_SNAPSHOT, "saved": link_cache.save_snapshot(HOT_LINKS_SNAPSHOT)}
+
+
+@router.post("/hot-links/prewarm")
+def prewarm_hot_links(
+    url_collection: MongoClient = Depends(get_url_collection),
+    authorized: bool = Depends(check_admin_from_authorization),
+) -> dict:
+    """
+    Pin the links of the saved snapshot in the cache.
+
+    :param url_collection: MongoDB collection dependency.
+    :param authorized: Admin authorization check.
+    :return: The number of pinned links.
+    """
+    try:
+        pinned = link_cache.prewarm(HOT_LINKS_SNAPSHOT, url_collection)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Hot links snapshot not found")
+    return {"pinned": pinned}
@@ -1,9 +1,19 @@
 from fastapi import APIRouter, status, Depends, HTTPException
 from pymongo import MongoClient
-from app.models.auth import LoginEntity, RegisterEntity
-from app.database.crud import add_user_to_database, get_user_from_database
-from app.database.connection import get_user_collection
-from app.core.security import encode_jwt_token, hash_password, verify_password
+from app.models.auth import LoginEntity, RegisterEntity, RefreshEntity
+from app.database.crud import (
+    add_user_to_database,
+    get_user_from_database,
+    revoke_refresh_tokens,
+    use_refresh_token,
+)
+from app.database.connection import get_refresh_token_collection, get_user_collection
+from app.core.security import (
+    decode_refresh_token,
+    hash_password,
+    issue_tokens,
+    verify_password,
+)
 
 
 router = APIRouter()
@@ -11,7 +21,9 @@ router = APIRouter()
 
 @router.post("/login")
 async def login(
-    payload: LoginEntity, user_collection: MongoClient = Depends(get_user_collection)
+    payload: LoginEntity,
+    user_collection: MongoClient = Depends(get_user_collection),
+    refresh_token_collection: MongoClient = Depends(get_refresh_token_collection),
 ) -> dict:
     """
     Endpoint for user login.
@@ -20,7 +32,7 @@ async def login(
         payload (LoginEntity): The login entity containing user email.
 
     Returns:
-        dict: JWT token if login is successful.
+        dict: JWT access and refresh tokens if login is successful.
     """
 
     user = get_user_from_database(email=payload.email, user_collection=user_collection)
@@ -29,9 +41,60 @@ async def login(
     if not verify_password(payload.password, user['password']):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
                             detail='Incorrect Email or Password')
-    
-    user["_id"] = str(user["_id"])
-    return encode_jwt_token(data=user)
+
+    return issue_tokens(subject=user["email"], refresh_token_collection=refresh_token_collection)
+
+
+@router.post("/refresh")
+async def refresh(
+    payload: RefreshEntity,
+    user_collection: MongoClient = Depends(get_user_collection),
+    refresh_token_collection: MongoClient = Depends(get_refresh_token_collection),
+) -> dict:
+    """
+    Endpoint for exchanging a refresh token for new tokens.
+
+    Each refresh token can be exchanged once. Presenting one again revokes
+    every refresh token issued since the same login.
+
+    Args:
+        payload (RefreshEntity): The refresh entity containing the refresh token.
+
+    Returns:
+        dict: New JWT access and refresh tokens.
+    """
+    claims = decode_refresh_token(payload.refresh_token)
+    if not use_refresh_token(claims["jti"], claims["fam"], refresh_token_collection):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                            detail='Refresh token already used or revoked')
+
+    # Make sure the user still exists
+    user = get_user_from_database(email=claims["sub"], user_collection=user_collection)
+
+    return issue_tokens(
+        subject=user["email"],
+        refresh_token_collection=refresh_token_collection,
+        family=claims["fam"],
+    )
+
+
+@router.post("/logout")
+async def logout(
+    payload: RefreshEntity,
+    refresh_token_collection: MongoClient = Depends(get_refresh_token_collection),
+) -> dict:
+    """
+    Endpoint for ending a session.
+
+    Args:
+        payload (RefreshEntity): The refresh entity containing the refresh token.
+
+    Returns:
+        dict: Confirmation message once every refresh token of the session is revoked.
+    """
+    claims = decode_refresh_token(payload.refresh_token)
+    revoke_refresh_tokens(claims["fam"], refresh_token_collection)
+    return {"detail": "Logged out."}
 
 
 @router.post("/register", status_code=status.HTTP_201_CREATED)
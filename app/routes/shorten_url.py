@@ -1,121 +1,209 @@
-from fastapi import HTTPException, APIRouter, Depends
+from fastapi import HTTPException, APIRouter, Depends, Request
+from typing import Optional
 from pymongo import MongoClient
-from fastapi.responses import RedirectResponse, FileResponse
-import shortuuid
-import qrcode
+from fastapi.responses import RedirectResponse, FileResponse, StreamingResponse
 import os
 
-from app.models.shorten_url import URL
-from app.database.connection import get_url_collection
+from app.models.shorten_url import URL, QRExport
+from app.database.connection import (
+    get_url_collection,
+    get_url_hash_collection,
+    get_domain_collection,
+)
 from app.database.crud import (
-    add_url_to_database,
+    count_urls_in_domain,
     get_url_from_database,
-    increment_hit_count,
+    iter_urls_from_database,
 )
 from app.core.security import check_token_from_authorization
+from app.core.profiling import profile_stage, profiled
+from app.core.domains import domain_registry, normalize_host
+from app.core.qr import generate_qr_code, qr_code_path
+from app.core.jobs import JobQueue, get_job_queue
+from app.core.link_jobs import enqueue_link_post_processing
+from app.core.links import shorten_link
+from app.core.qr_export import QR_EXPORT_MAX_LINKS, stream_qr_zip
+from app.core.hot_links import link_cache
+from app.core.resilience import link_resilience
 
 router = APIRouter()
 
-BASE_URL = "http://localhost:8000/shorten"  # Centralized URL for flexibility
-
-
-def generate_qr_code(link: str, short_id: str) -> str:
-    """
-    Generate a QR code for the given link and save it as an image.
-
-    :param link: The link to embed in the QR code.
-    :param short_id: The short identifier for the URL.
-    :return: File path of the saved QR code image.
-    """
-    qr_img = qrcode.make(link)
-    file_path = f"qr_codes/{short_id}.png"
-    os.makedirs("qr_codes", exist_ok=True)  # Ensure the directory exists
-    qr_img.save(file_path)
-    return file_path
-
 
-def create_short_id() -> str:
+def resolve_link_domain(requested_domain: Optional[str], request: Request) -> Optional[str]:
     """
-    Generate a unique short ID for the shortened URL.
+    Pick the short domain a new link is created in.
 
-    :return: A random 6-character string.
+    :param requested_domain: The domain given in the payload, if any.
+    :param request: The incoming request, whose host is used otherwise.
+    :return: The registered domain, or None for the default domain.
     """
-    return shortuuid.ShortUUID().random(length=6)
+    if requested_domain is None:
+        return domain_registry.resolve(request.headers.get("host"))
+    if not domain_registry.is_registered(requested_domain):
+        raise HTTPException(status_code=400, detail="Unknown domain")
+    return normalize_host(requested_domain)
 
 
-def format_url_data(original_url: str, short_id: str, qr_code_path: str) -> dict:
+def format_url_response(url_data: dict) -> dict:
     """
-    Format URL data for storage in the database.
+    Build the API response for stored URL data.
 
-    :param original_url: The original long URL.
-    :param short_id: The unique short identifier.
-    :param qr_code_path: The path to the QR code image.
-    :return: A dictionary with formatted URL data.
+    :param url_data: The URL data read from or added to the database.
+    :return: A dictionary with the short URL, QR code URL, hit count and short ID.
     """
+    short_id = url_data["short_id"]
+    base_url = domain_registry.base_url(url_data.get("domain"))
     return {
-        "original_url": original_url,
-        "short_url": f"{BASE_URL}/{short_id}",
+        "short_url": f"{base_url}/{short_id}",
+        "qr_code": f"{base_url}/qr/{short_id}",
+        "hit_count": url_data["hit_count"],
         "short_id": short_id,
-        "hit_count": 0,
-        "qr_code": qr_code_path,
-        "qr_url": f"{BASE_URL}/qr/{short_id}",
     }
 
 
 @router.post("/")
+@profiled
 def shorten_url(
     url: URL,
+    request: Request,
     url_collection: MongoClient = Depends(get_url_collection),
+    url_hash_collection: MongoClient = Depends(get_url_hash_collection),
+    domain_collection: MongoClient = Depends(get_domain_collection),
+    job_queue: JobQueue = Depends(get_job_queue),
     authorized: bool = Depends(check_token_from_authorization),
 ) -> dict:
     """
-    Shorten a URL, generate a QR code, and store the data in the database.
+    Shorten a URL and store the data in the database.
+
+    The link is created in the domain given in the payload, or else in the
+    domain of the request host; unregistered hosts use the default domain.
+    The response is returned once the link is stored; QR rendering and the
+    optional link checks run as background jobs.
 
     :param url: The URL to shorten.
+    :param request: The incoming request.
     :param url_collection: MongoDB collection dependency.
+    :param url_hash_collection: MongoDB url_hashes collection dependency.
+    :param domain_collection: MongoDB domains collection dependency.
+    :param job_queue: Background job queue dependency.
     :param authorized: Authorization status check.
     :return: A dictionary containing the short URL, QR code, and hit count.
     """
-    existing_url = get_url_from_database(
-        input={"original_url": str(url.original_url)}, url_collection=url_collection
-    )
-
-    if existing_url:
-        return {
-            "short_url": existing_url["short_url"],
-            "qr_code": existing_url["qr_url"],
-            "hit_count": existing_url["hit_count"],
-            "short_id": existing_url["short_id"],
-        }
+    domain_registry.ensure_loaded(domain_collection)
+    # Without the domain table a branded link would be created in the default domain
+    if not domain_registry.loaded:
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    domain = resolve_link_domain(url.domain, request)
+
+    with profile_stage("db"):
+        url_data, created = shorten_link(
+            str(url.original_url), domain, url_collection, url_hash_collection
+        )
+    if not created:
+        return format_url_response(url_data)
+
+    short_url = f"{domain_registry.base_url(domain)}/{url_data['short_id']}"
+    with profile_stage("jobs"):
+        enqueue_link_post_processing(job_queue, url_data, short_url)
+    return format_url_response(url_data)
+
+
+@router.post("/qr/export")
+def export_qr_codes(
+    payload: QRExport,
+    url_collection: MongoClient = Depends(get_url_collection),
+    domain_collection: MongoClient = Depends(get_domain_collection),
+    authorized: bool = Depends(check_token_from_authorization),
+) -> StreamingResponse:
+    """
+    Stream a ZIP archive with the QR code images of many short links.
 
-    short_id = create_short_id()
-    short_url = f"{BASE_URL}/{short_id}"
-    qr_code_path = generate_qr_code(short_url, short_id)
+    Images are rendered in parallel across processes and streamed as they
+    finish, so memory use stays flat regardless of the batch size. Exports
+    of more than ``QR_EXPORT_MAX_LINKS`` links are refused.
 
-    url_data = format_url_data(str(url.original_url), short_id, qr_code_path)
-    return add_url_to_database(url_data=url_data, url_collection=url_collection)
+    :param payload: The short IDs to export, or the domain whose links are exported.
+    :param url_collection: MongoDB collection dependency.
+    :param domain_collection: MongoDB domains collection dependency.
+    :param authorized: Authorization status check.
+    :return: A streaming response with the ZIP archive.
+    """
+    domain_registry.ensure_loaded(domain_collection)
+    if not domain_registry.loaded:
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    domain = None
+    if payload.short_ids is not None:
+        exported = len(set(payload.short_ids))
+    else:
+        if domain_registry.is_registered(payload.domain):
+            domain = normalize_host(payload.domain)
+        elif normalize_host(payload.domain) != domain_registry.default_host:
+            raise HTTPException(status_code=400, detail="Unknown domain")
+        exported = count_urls_in_domain(url_collection, domain, limit=QR_EXPORT_MAX_LINKS + 1)
+    if exported > QR_EXPORT_MAX_LINKS:
+        raise HTTPException(
+            status_code=413, detail=f"Exports are limited to {QR_EXPORT_MAX_LINKS} links"
+        )
+
+    urls = iter_urls_from_database(
+        url_collection, short_ids=payload.short_ids, domain=domain
+    )
+    links = (
+        (url_data["short_id"], f"{domain_registry.base_url(url_data['domain'])}/{url_data['short_id']}")
+        for url_data in urls
+    )
+    return StreamingResponse(
+        stream_qr_zip(links),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="qr_codes.zip"'},
+    )
 
 
 @router.get("/{short_id}")
+@profiled
 def redirect_url(
     short_id: str,
+    request: Request,
     url_collection: MongoClient = Depends(get_url_collection),
+    domain_collection: MongoClient = Depends(get_domain_collection),
 ) -> RedirectResponse:
     """
     Redirect the user to the original URL associated with the short ID.
 
+    The domain is resolved from the Host header against the in-memory domain
+    table, so a link costs a single lookup by short ID and only resolves on
+    the domain it was created in. Mappings are served from the hot-link cache
+    when possible, and every redirect feeds the hot-link tracker. Cache misses
+    go through the local link store, so known links keep redirecting while
+    MongoDB is unavailable; hits are buffered there and written in the
+    background.
+
     :param short_id: The short URL identifier.
+    :param request: The incoming request.
     :param url_collection: MongoDB collection dependency.
+    :param domain_collection: MongoDB domains collection dependency.
     :return: A redirect response to the original URL.
     """
-    url_data = get_url_from_database(
-        input={"short_id": short_id}, url_collection=url_collection
-    )
-
-    if not url_data:
+    domain_registry.ensure_loaded(domain_collection)
+    domain = domain_registry.resolve(request.headers.get("host"))
+
+    url_data = link_cache.get(short_id)
+    if url_data is None:
+        with profile_stage("db"):
+            url_data = link_resilience.resolve(short_id, url_collection)
+        if url_data:
+            link_cache.put(short_id, url_data)
+
+    if url_data and url_data["domain"] != domain and not domain_registry.loaded:
+        # The host may be a branded domain that is not known yet
+        raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+    if not url_data or url_data["domain"] != domain:
         raise HTTPException(status_code=404, detail="Short URL not found")
+    if url_data["flagged"]:
+        raise HTTPException(status_code=403, detail="Short URL blocked")
 
-    increment_hit_count(short_id=short_id, url_collection=url_collection)
+    link_cache.record_hit(short_id)
+    link_resilience.count_hit(short_id, url_collection)
     return RedirectResponse(url=url_data["original_url"])
 
 
@@ -123,17 +211,34 @@ def redirect_url(
 def get_qr_code(
     short_id: str,
     url_collection: MongoClient = Depends(get_url_collection),
+    domain_collection: MongoClient = Depends(get_domain_collection),
 ) -> FileResponse:
     """
     Return the QR code image associated with the given short ID.
 
+    The image is rendered on demand if its background job has not run yet.
+
     :param short_id: The short URL identifier.
     :param url_collection: MongoDB collection dependency.
+    :param domain_collection: MongoDB domains collection dependency.
     :return: A file response with the QR code image.
     """
-    url_data = url_collection.find_one({"short_id": short_id})
+    url_data = get_url_from_database(
+        input={"short_id": short_id}, url_collection=url_collection
+    )
 
-    if not url_data or not os.path.exists(url_data["qr_code"]):
+    if not url_data:
         raise HTTPException(status_code=404, detail="QR code not found")
 
-    return FileResponse(url_data["qr_code"])
+    file_path = qr_code_path(short_id)
+    if not os.path.exists(file_path):
+        domain_registry.ensure_loaded(domain_collection)
+        domain = url_data["domain"]
+        # The image is kept, so it must not be rendered with the default base URL
+        if domain is not None and not domain_registry.is_registered(domain):
+            raise HTTPException(status_code=503, detail="Service temporarily unavailable")
+        short_url = f"{domain_registry.base_url(domain)}/{short_id}"
+        with profile_stage("qr"):
+            generate_qr_code(short_url, short_id)
+
+    return FileResponse(file_path)
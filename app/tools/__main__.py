@@ -0,0 +1,71 @@
+# Bulk import and export of the link database
+#
+# Run from the project root:
+#     python -m app.tools export links.ndjson --with-qr
+#     python -m app.tools import links.ndjson --workers 8
+# Files ending in .parquet are read and written as Parquet (requires pyarrow).
+# Add --resume to continue an interrupted run from its checkpoint.
+
+import argparse
+import json
+from typing import List, Optional
+
+from app.tools.bulk import FORMATS, Throughput, detect_format, export_links, import_links
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Import or export links.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = commands.add_parser("export", help="write every link to a file")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--format", choices=FORMATS)
+    export_parser.add_argument("--batch-size", type=int, default=5000)
+    export_parser.add_argument("--with-qr", action="store_true", help="include the QR code PNG of each link")
+    export_parser.add_argument("--resume", action="store_true")
+
+    import_parser = commands.add_parser("import", help="add the links of a file")
+    import_parser.add_argument("path")
+    import_parser.add_argument("--format", choices=FORMATS)
+    import_parser.add_argument("--batch-size", type=int, default=1000)
+    import_parser.add_argument("--workers", type=int, default=4, help="batches written concurrently")
+    import_parser.add_argument("--resume", action="store_true")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    from app.database.connection import (
+        get_domain_collection,
+        get_url_collection,
+        get_url_hash_collection,
+    )
+
+    args = parse_args()
+    file_format = detect_format(args.path, args.format)
+    throughput = Throughput(args.command)
+    if args.command == "export":
+        total = export_links(
+            get_url_collection(),
+            get_domain_collection(),
+            args.path,
+            file_format=file_format,
+            batch_size=args.batch_size,
+            with_qr=args.with_qr,
+            resume=args.resume,
+            throughput=throughput,
+        )
+        print(f"Done, {total} links exported to {args.path}")
+    else:
+        totals = import_links(
+            get_url_collection(),
+            get_url_hash_collection(),
+            get_domain_collection(),
+            args.path,
+            file_format=file_format,
+            batch_size=args.batch_size,
+            workers=args.workers,
+            resume=args.resume,
+            throughput=throughput,
+        )
+        print(f"Done, {json.dumps(totals)}")
+    print(throughput.summary())
@@ -0,0 +1,398 @@
+# Streaming bulk import and export of links as NDJSON or Parquet, see
+# app/tools/__main__.py for the command line.
+
+import base64
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from app.core.domains import domain_registry, normalize_host
+from app.core.links import SHORT_ID_ATTEMPTS, create_short_id
+from app.core.qr import qr_code_path, render_qr_png, save_qr_png
+from app.database.crud import add_urls_to_database, iter_url_batches
+from app.models.shorten_url import URL
+
+FORMATS = ["ndjson", "parquet"]
+EXPORT_FIELDS = ["short_id", "original_url", "domain", "hit_count", "reachable", "flagged", "title"]
+
+
+def detect_format(path: str, file_format: Optional[str] = None) -> str:
+    """
+    Return the file format given, or the one implied by the file extension.
+    """
+    if file_format:
+        return file_format
+    return "parquet" if path.endswith(".parquet") else "ndjson"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise EnvironmentError("Parquet files require the pyarrow package")
+    return pyarrow
+
+
+class Checkpoint:
+    """
+    Progress of a bulk run, saved next to its file so that an interrupted
+    run can be resumed where it stopped.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.checkpoint"
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return None
+        with open(self.path) as checkpoint:
+            return json.load(checkpoint)
+
+    def save(self, state: Dict[str, Any]) -> None:
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as checkpoint:
+            json.dump(state, checkpoint)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class Throughput:
+    """
+    Counts processed links and reports the rate at a fixed interval.
+    """
+
+    def __init__(self, label: str, interval: float = 5.0, out=sys.stderr):
+        self.label = label
+        self.interval = interval
+        self.out = out
+        self.count = 0
+        self.started = time.perf_counter()
+        self._reported = self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def add(self, count: int) -> None:
+        self.count += count
+        now = time.perf_counter()
+        if now - self._reported >= self.interval:
+            self._reported = now
+            print(self.summary(), file=self.out)
+
+    def summary(self) -> str:
+        return f"{self.label}: {self.count} links, {self.rate:.0f} links/s"
+
+
+def _attach_qr_images(batch: List[Dict[str, Any]], executor: Executor) -> None:
+    """
+    Add the PNG of each link's QR code, rendering the missing ones on the executor.
+    """
+    missing = []
+    for url_data in batch:
+        path = qr_code_path(url_data["short_id"])
+        if os.path.exists(path):
+            with open(path, "rb") as image:
+                url_data["qr_png"] = image.read()
+        else:
+            missing.append(url_data)
+    links = (
+        f"{domain_registry.base_url(url_data['domain'])}/{url_data['short_id']}" for url_data in missing
+    )
+    for url_data, png in zip(missing, executor.map(render_qr_png, links, chunksize=16)):
+        url_data["qr_png"] = png
+
+
+def export_links(
+    url_collection,
+    domain_collection,
+    path: str,
+    file_format: str = "ndjson",
+    batch_size: int = 1000,
+    with_qr: bool = False,
+    resume: bool = False,
+    executor: Optional[Executor] = None,
+    throughput: Optional[Throughput] = None,
+) -> int:
+    """
+    Stream every link to a file, in short ID order.
+
+    Links are read one batch at a time, so memory use does not depend on the
+    number of links. NDJSON exports save a checkpoint after every batch and
+    can be resumed; QR images are base64 encoded in NDJSON.
+
+    :param url_collection: MongoDB collection.
+    :param domain_collection: MongoDB domains collection.
+    :param path: The output file.
+    :param file_format: "ndjson" or "parquet".
+    :param batch_size: Number of links read per query.
+    :param with_qr: Whether to include the QR code PNG of each link.
+    :param resume: Whether to resume from the checkpoint of an interrupted export.
+    :param executor: Executor rendering missing QR images, the QR export pool by default.
+    :param throughput: Reporter of the export progress.
+    :return: The number of exported links.
+    """
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() if resume else None
+    if state and file_format != "ndjson":
+        raise ValueError("Only NDJSON exports can be resumed")
+    if with_qr:
+        domain_registry.load(domain_collection)
+        if executor is None:
+            from app.core.qr_export import get_export_pool
+
+            executor = get_export_pool()
+    throughput = throughput or Throughput("export")
+
+    after_id = state["last_id"] if state else None
+    exported = state["records"] if state else 0
+    batches = iter_url_batches(url_collection, after_id=after_id, batch_size=batch_size)
+
+    if file_format == "parquet":
+        pyarrow = _import_pyarrow()
+        columns = [
+            ("short_id", pyarrow.string()),
+            ("original_url", pyarrow.string()),
+            ("domain", pyarrow.string()),
+            ("hit_count", pyarrow.int64()),
+            ("reachable", pyarrow.bool_()),
+            ("flagged", pyarrow.bool_()),
+            ("title", pyarrow.string()),
+        ]
+        if with_qr:
+            columns.append(("qr_png", pyarrow.binary()))
+        schema = pyarrow.schema(columns)
+        with pyarrow.parquet.ParquetWriter(path, schema) as writer:
+            for batch in batches:
+                if with_qr:
+                    _attach_qr_images(batch, executor)
+                writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+                exported += len(batch)
+                throughput.add(len(batch))
+        return exported
+
+    with open(path, "r+b" if state else "wb") as output:
+        if state:
+            # Drop whatever was written after the last checkpoint
+            output.truncate(state["offset"])
+            output.seek(state["offset"])
+        for batch in batches:
+            if with_qr:
+                _attach_qr_images(batch, executor)
+            lines = []
+            for url_data in batch:
+                record = {field: url_data[field] for field in EXPORT_FIELDS}
+                if with_qr:
+                    record["qr_png"] = base64.b64encode(url_data["qr_png"]).decode("ascii")
+                lines.append(json.dumps(record, separators=(",", ":")))
+            output.write(("\n".join(lines) + "\n").encode("utf-8"))
+            output.flush()
+            exported += len(batch)
+            checkpoint.save(
+                {"last_id": batch[-1]["short_id"], "offset": output.tell(), "records": exported}
+            )
+            throughput.add(len(batch))
+    checkpoint.clear()
+    return exported
+
+
+def _read_batches(
+    path: str, file_format: str, batch_size: int, state: Optional[Dict[str, Any]]
+) -> Iterator[Tuple[List[Any], Dict[str, Any]]]:
+    """
+    Yield batches of raw records with the checkpoint state reached after each.
+
+    NDJSON records are JSON strings, parsed by the import workers; Parquet
+    records are dictionaries.
+    """
+    records = state["records"] if state else 0
+    if file_format == "parquet":
+        pyarrow = _import_pyarrow()
+        skip = records
+        for record_batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=batch_size):
+            rows = record_batch.to_pylist()
+            if skip:
+                skipped = min(skip, len(rows))
+                rows, skip = rows[skipped:], skip - skipped
+            if rows:
+                records += len(rows)
+                yield rows, {"records": records}
+        return
+
+    offset = state["offset"] if state else 0
+    with open(path, "rb") as source:
+        source.seek(offset)
+        batch = []
+        for line in source:
+            offset += len(line)
+            if line.strip():
+                batch.append(line)
+            if len(batch) == batch_size:
+                records += len(batch)
+                yield batch, {"records": records, "offset": offset}
+                batch = []
+        if batch:
+            records += len(batch)
+            yield batch, {"records": records, "offset": offset}
+
+
+def _url_data_from_record(record: Any) -> Dict[str, Any]:
+    """
+    Validate an imported record and convert it to url data.
+
+    Original URLs are normalized like those shortened through the API, so
+    that duplicates are detected the same way.
+
+    :raises ValueError: If the record is invalid.
+    """
+    if isinstance(record, bytes):
+        record = json.loads(record)
+    if not isinstance(record, dict):
+        raise ValueError("Record is not an object")
+    url = URL(original_url=record.get("original_url"), domain=record.get("domain"))
+    domain = None
+    if url.domain:
+        domain = normalize_host(url.domain)
+        if not domain_registry.is_registered(domain):
+            raise ValueError(f"Unknown domain {domain}")
+
+    url_data = {
+        "original_url": str(url.original_url),
+        "short_id": record.get("short_id") or None,
+        "hit_count": int(record.get("hit_count") or 0),
+        "domain": domain,
+        "reachable": record.get("reachable"),
+        # Unflagged is the default and is not stored
+        "flagged": record.get("flagged") or None,
+        "title": record.get("title"),
+    }
+    qr_png = record.get("qr_png")
+    if qr_png:
+        url_data["qr_png"] = base64.b64decode(qr_png) if isinstance(qr_png, str) else qr_png
+    return url_data
+
+
+def _import_batch(records: List[Any], url_collection, url_hash_collection) -> Dict[str, int]:
+    """
+    Import a batch of records and return how many were added, existing,
+    conflicting or invalid.
+    """
+    stats = {"added": 0, "existing": 0, "conflicts": 0, "invalid": 0}
+    pending = []
+    generated = set()
+    for record in records:
+        try:
+            url_data = _url_data_from_record(record)
+        except (ValueError, TypeError) as e:
+            stats["invalid"] += 1
+            print(f"Skipping invalid record: {str(e)}", file=sys.stderr)
+            continue
+        if url_data["short_id"] is None:
+            url_data["short_id"] = create_short_id()
+            generated.add(url_data["short_id"])
+        pending.append(url_data)
+
+    for attempt in range(SHORT_ID_ATTEMPTS):
+        result = add_urls_to_database(pending, url_collection, url_hash_collection)
+        stats["added"] += len(result["added"])
+        stats["existing"] += len(result["existing"])
+        for url_data in result["added"]:
+            if "qr_png" in url_data:
+                save_qr_png(url_data["short_id"], url_data["qr_png"])
+
+        pending = []
+        for url_data in result["conflicts"]:
+            # Links keep the short ID they were exported with; only
+            # allocated IDs are drawn again
+            if url_data["short_id"] in generated and attempt + 1 < SHORT_ID_ATTEMPTS:
+                url_data["short_id"] = create_short_id()
+                generated.add(url_data["short_id"])
+                pending.append(url_data)
+            else:
+                stats["conflicts"] += 1
+                print(f"Short ID {url_data['short_id']} is already taken", file=sys.stderr)
+        if not pending:
+            break
+    return stats
+
+
+def import_links(
+    url_collection,
+    url_hash_collection,
+    domain_collection,
+    path: str,
+    file_format: str = "ndjson",
+    batch_size: int = 1000,
+    workers: int = 4,
+    resume: bool = False,
+    throughput: Optional[Throughput] = None,
+) -> Dict[str, int]:
+    """
+    Stream links from a file into the database.
+
+    Batches are written in parallel with one bulk write per collection, and
+    only a few batches are held in memory at a time. An original URL is
+    added once per domain, as through the API, so re-importing a file is
+    harmless. Links keep their short ID if the record has one, otherwise a
+    new one is allocated. A checkpoint is saved as batches complete, so an
+    interrupted import can be resumed.
+
+    :param url_collection: MongoDB collection.
+    :param url_hash_collection: MongoDB url_hashes collection.
+    :param domain_collection: MongoDB domains collection.
+    :param path: The input file.
+    :param file_format: "ndjson" or "parquet".
+    :param batch_size: Number of links per bulk write.
+    :param workers: Number of batches written concurrently.
+    :param resume: Whether to resume from the checkpoint of an interrupted import.
+    :param throughput: Reporter of the import progress.
+    :return: The number of added, existing, conflicting and invalid links.
+    """
+    domain_registry.load(domain_collection)
+    checkpoint = Checkpoint(path)
+    state = checkpoint.load() if resume else None
+    throughput = throughput or Throughput("import")
+    totals = {"added": 0, "existing": 0, "conflicts": 0, "invalid": 0}
+
+    # Checkpoints only advance over batches that completed in order
+    completed: Dict[int, Dict[str, Any]] = {}
+    next_index = 0
+    in_flight = {}
+
+    def collect(done) -> None:
+        nonlocal next_index
+        for future in done:
+            index, batch_state = in_flight.pop(future)
+            for key, value in future.result().items():
+                totals[key] += value
+            throughput.add(batch_state["size"])
+            completed[index] = batch_state["checkpoint"]
+        while next_index in completed:
+            checkpoint.save(completed.pop(next_index))
+            next_index += 1
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            batches = _read_batches(path, file_format, batch_size, state)
+            for index, (records, batch_checkpoint) in enumerate(batches):
+                if len(in_flight) >= workers * 2:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done)
+                future = executor.submit(_import_batch, records, url_collection, url_hash_collection)
+                in_flight[future] = (index, {"size": len(records), "checkpoint": batch_checkpoint})
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done)
+        finally:
+            for future in in_flight:
+                future.cancel()
+    checkpoint.clear()
+    return totals
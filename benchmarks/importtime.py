@@ -0,0 +1,190 @@
+# Import-time and cold-start report for the API
+#
+#     python -m benchmarks.importtime
+#     python -m benchmarks.importtime --top 30 --report-json importtime_report.json
+#
+# Import times come from `python -X importtime`; the app is then started,
+# lifespan included, and serves its first request in a fresh interpreter over
+# ASGI with an in-memory database.
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+# Modules that must only be imported on first use, not at startup
+LAZY_MODULES = ["qrcode", "PIL", "passlib", "shortuuid"]
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(.+)$")
+
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+imported = time.perf_counter()
+
+import asyncio, httpx, mongomock
+from app.database import connection
+from app.main import app
+
+# Every collection, including those used at startup, is in memory
+connection._db = mongomock.MongoClient()["importtime"]
+
+async def first_request():
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://importtime") as client:
+            response = await client.get("/shorten/missing")
+        served = time.perf_counter()
+        app.state.warm_up.result()
+    return response.status_code, ready - started, served - ready
+
+status, startup, elapsed = asyncio.run(first_request())
+print(json.dumps({{
+    "import_s": imported - start,
+    "startup_s": startup,
+    "first_request_s": elapsed,
+    "status": status,
+    "lazy_modules_loaded": [name for name in {lazy_modules!r} if name in sys.modules],
+}}))
+"""
+
+
+def parse_importtime(output: str) -> List[Dict[str, Any]]:
+    """
+    Parse the stderr of `python -X importtime`.
+
+    Args:
+        output (str): The stderr of the interpreter.
+
+    Returns:
+        List[Dict[str, Any]]: One entry per module with its self and
+            cumulative time in microseconds and its nesting depth.
+    """
+    modules = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            modules.append(
+                {
+                    "module": name,
+                    "self_us": int(self_us),
+                    "cumulative_us": int(cumulative_us),
+                    "depth": (len(indent) - 1) // 2,
+                }
+            )
+    return modules
+
+
+def measure_imports(module: str) -> List[Dict[str, Any]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_first_request(module: str) -> Dict[str, Any]:
+    """
+    Start a fresh interpreter, import and start the app and serve one redirect.
+
+    Returns:
+        Dict[str, Any]: Import, startup and first-request times in seconds, the
+            response status, the lazy modules that were loaded and the
+            wall time of the whole process.
+    """
+    script = FIRST_REQUEST_SCRIPT.format(module=module, lazy_modules=LAZY_MODULES)
+    # The local link store of the measured process is thrown away with it
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        env = {**os.environ, "LOCAL_LINK_CACHE_PATH": os.path.join(tmp_dir, "links.sqlite3")}
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, "-c", script], capture_output=True, text=True, check=True, env=env
+        )
+        process_s = time.perf_counter() - start
+    measurement = json.loads(result.stdout.strip().splitlines()[-1])
+    measurement["process_s"] = process_s
+    return measurement
+
+
+def build_report(module: str, top: int, repeat: int) -> Dict[str, Any]:
+    """
+    Measure the imports and the first request, keeping the fastest of repeated runs.
+
+    Args:
+        module (str): The module to import.
+        top (int): Number of modules listed by self and cumulative time.
+        repeat (int): Number of runs.
+
+    Returns:
+        Dict[str, Any]: The report.
+    """
+    runs = [measure_imports(module) for _ in range(repeat)]
+    modules = min(runs, key=lambda run: sum(entry["self_us"] for entry in run))
+    startups = [measure_first_request(module) for _ in range(repeat)]
+    startup = min(
+        startups, key=lambda run: run["import_s"] + run["startup_s"] + run["first_request_s"]
+    )
+
+    top_level = [entry for entry in modules if entry["depth"] == 1]
+    return {
+        "module": module,
+        "total_import_ms": sum(entry["self_us"] for entry in modules) / 1000,
+        "modules_imported": len(modules),
+        "by_cumulative": sorted(top_level, key=lambda entry: entry["cumulative_us"], reverse=True)[:top],
+        "by_self": sorted(modules, key=lambda entry: entry["self_us"], reverse=True)[:top],
+        "startup": startup,
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(
+        f"import {report['module']}: {report['total_import_ms']:.1f} ms, "
+        f"{report['modules_imported']} modules"
+    )
+    for title, key, field in (
+        ("Top-level imports by cumulative time", "by_cumulative", "cumulative_us"),
+        ("Modules by self time", "by_self", "self_us"),
+    ):
+        print(f"\n{title}:")
+        for entry in report[key]:
+            print(f"  {entry[field] / 1000:9.1f} ms  {entry['module']}")
+
+    startup = report["startup"]
+    print(
+        f"\nCold start: import {startup['import_s'] * 1000:.1f} ms, "
+        f"startup {startup['startup_s'] * 1000:.1f} ms, "
+        f"first request {startup['first_request_s'] * 1000:.1f} ms "
+        f"(status {startup['status']}), process {startup['process_s'] * 1000:.1f} ms"
+    )
+    if startup["lazy_modules_loaded"]:
+        print(f"Loaded at startup but expected lazily: {', '.join(startup['lazy_modules_loaded'])}")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Report import and cold-start times.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--repeat", type=int, default=3, help="runs, the fastest is reported")
+    parser.add_argument("--report-json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = build_report(args.module, args.top, args.repeat)
+    print_report(report)
+    if args.report_json:
+        with open(args.report_json, "w") as report_file:
+            json.dump(report, report_file, indent=2)
+        print(f"Report written to {args.report_json}")
@@ -0,0 +1,344 @@
+# Load generator reproducing production-shaped traffic against the API
+#
+# Against a running stack (app + mongod, e.g. docker compose):
+#     python -m benchmarks.loadtest --target http://localhost:8000
+# Fully in-process, with the app served over ASGI and an in-memory database:
+#     python -m benchmarks.loadtest --in-process --duration 5
+#
+# Everything runs offline; the only network traffic is to the target.
+
+import argparse
+import asyncio
+import html
+import json
+import math
+import os
+import random
+import string
+import tempfile
+import time
+from contextlib import ExitStack
+from itertools import accumulate
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+SCENARIOS = ["redirect_storm", "batch_shorten", "qr_burst", "login_wave", "not_found_scan"]
+
+
+class ScenarioStats:
+    """
+    Latencies and outcomes recorded for one scenario.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+        self.errors = 0
+        self.elapsed = 0.0
+
+    def record(self, latency: float, status: str, ok: bool) -> None:
+        self.latencies.append(latency)
+        self.status_codes[status] = self.status_codes.get(status, 0) + 1
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarize the scenario with throughput, error rate and percentiles.
+
+        Returns:
+            Dict[str, Any]: The summary, latencies in milliseconds.
+        """
+        count = len(self.latencies)
+        ordered = sorted(self.latencies)
+        return {
+            "scenario": self.name,
+            "requests": count,
+            "errors": self.errors,
+            "error_rate": self.errors / count if count else 0.0,
+            "throughput_rps": count / self.elapsed if self.elapsed else 0.0,
+            "latency_ms": {
+                label: percentile(ordered, value) * 1000
+                for label, value in (("p50", 50), ("p90", 90), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "status_codes": self.status_codes,
+        }
+
+
+def percentile(ordered: List[float], value: float) -> float:
+    """
+    Return the nearest-rank percentile of already sorted samples.
+
+    Args:
+        ordered (List[float]): The sorted samples.
+        value (float): The percentile, between 0 and 100.
+
+    Returns:
+        float: The percentile, or 0.0 without samples.
+    """
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(value / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def zipf_cum_weights(size: int, exponent: float) -> List[float]:
+    """
+    Return cumulative Zipf weights so that rank k is picked with weight 1 / k^s.
+
+    Args:
+        size (int): Number of ranked items.
+        exponent (float): The Zipf exponent s; higher means more skew.
+
+    Returns:
+        List[float]: Cumulative weights for random.choices.
+    """
+    return list(accumulate(1 / (rank ** exponent) for rank in range(1, size + 1)))
+
+
+def random_short_id(length: int = 6) -> str:
+    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+class LoadTest:
+    """
+    Seeds the target with a user and links, then runs the scenarios.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, args: argparse.Namespace):
+        self.client = client
+        self.args = args
+        self.headers: Dict[str, str] = {}
+        self.short_ids: List[str] = []
+        self.cum_weights: List[float] = []
+        self.counter = 0
+
+    async def setup(self) -> None:
+        """
+        Register and log in the load-test user and create the seed links.
+        """
+        credentials = {"email": self.args.email, "password": self.args.password}
+        response = await self.client.post(
+            "/auth/register", json={**credentials, "confirm_password": self.args.password}
+        )
+        if response.status_code not in (201, 409):
+            raise RuntimeError(f"Registration failed: {response.status_code} {response.text}")
+
+        response = await self.client.post("/auth/login", json=credentials)
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        for index in range(self.args.links):
+            response = await self.client.post(
+                "/shorten/",
+                json={"original_url": f"https://example.com/seed/{index}"},
+                headers=self.headers,
+            )
+            response.raise_for_status()
+            self.short_ids.append(response.json()["short_id"])
+        # Seed links are ranked in creation order, rank 1 being the most popular
+        self.cum_weights = zipf_cum_weights(len(self.short_ids), self.args.zipf_exponent)
+
+    def pick_short_id(self) -> str:
+        return random.choices(self.short_ids, cum_weights=self.cum_weights)[0]
+
+    async def redirect_storm(self) -> Tuple[int, bool]:
+        response = await self.client.get(f"/shorten/{self.pick_short_id()}")
+        return response.status_code, response.status_code == 307
+
+    async def batch_shorten(self) -> Tuple[int, bool]:
+        self.counter += 1
+        response = await self.client.post(
+            "/shorten/",
+            json={"original_url": f"https://example.com/batch/{time.time_ns()}/{self.counter}"},
+            headers=self.headers,
+        )
+        return response.status_code, response.status_code == 200
+
+    async def qr_burst(self) -> Tuple[int, bool]:
+        response = await self.client.get(f"/shorten/qr/{self.pick_short_id()}")
+        return response.status_code, response.status_code == 200
+
+    async def login_wave(self) -> Tuple[int, bool]:
+        response = await self.client.post(
+            "/auth/login", json={"email": self.args.email, "password": self.args.password}
+        )
+        return response.status_code, response.status_code == 200
+
+    async def not_found_scan(self) -> Tuple[int, bool]:
+        response = await self.client.get(f"/shorten/{random_short_id(8)}")
+        return response.status_code, response.status_code == 404
+
+    async def run_scenario(self, name: str) -> Dict[str, Any]:
+        """
+        Run one scenario with concurrent workers for the configured duration.
+
+        Args:
+            name (str): The scenario name.
+
+        Returns:
+            Dict[str, Any]: The scenario summary.
+        """
+        operation: Callable[[], Awaitable] = getattr(self, name)
+        stats = ScenarioStats(name)
+        deadline = time.perf_counter() + self.args.duration
+
+        async def worker() -> None:
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    status, ok = await operation()
+                    status = str(status)
+                except httpx.HTTPError as e:
+                    status, ok = type(e).__name__, False
+                stats.record(time.perf_counter() - start, status, ok)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(self.args.concurrency)))
+        stats.elapsed = time.perf_counter() - start
+        return stats.summary()
+
+
+def render_html(report: Dict[str, Any]) -> str:
+    """
+    Render the report as a standalone HTML page.
+
+    Args:
+        report (Dict[str, Any]): The JSON report.
+
+    Returns:
+        str: The HTML page.
+    """
+    rows = []
+    for result in report["scenarios"]:
+        latency = result["latency_ms"]
+        cells = [
+            html.escape(result["scenario"]),
+            str(result["requests"]),
+            f"{result['throughput_rps']:.1f}",
+            f"{result['error_rate'] * 100:.2f}%",
+            *(f"{latency[label]:.2f}" for label in ("p50", "p90", "p95", "p99", "max")),
+            html.escape(json.dumps(result["status_codes"])),
+        ]
+        rows.append("<tr>" + "".join(f"<td>{cell}</td>" for cell in cells) + "</tr>")
+
+    headers = ["Scenario", "Requests", "RPS", "Errors", "p50 ms", "p90 ms", "p95 ms", "p99 ms", "max ms", "Status codes"]
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Load test report</title>"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:4px 8px;text-align:right}</style></head><body>"
+        f"<h1>Load test report</h1><p>Target: {html.escape(report['target'])}, "
+        f"concurrency {report['concurrency']}, {report['duration_s']} s per scenario</p>"
+        "<table><tr>" + "".join(f"<th>{header}</th>" for header in headers) + "</tr>"
+        + "".join(rows) + "</table></body></html>"
+    )
+
+
+def in_process_transport(data_dir: str) -> httpx.ASGITransport:
+    """
+    Serve the app over ASGI with its collections backed by mongomock.
+
+    Args:
+        data_dir (str): Directory of the local link store and QR images of the run.
+
+    Returns:
+        httpx.ASGITransport: A transport calling the app directly.
+    """
+    import mongomock
+
+    from app.core import qr
+    from app.core.resilience import link_resilience
+    from app.database.connection import (
+        get_domain_collection,
+        get_job_collection,
+        get_url_collection,
+        get_url_hash_collection,
+        get_user_collection,
+    )
+    from app.main import app
+
+    # Files of the run start empty and are thrown away with it, like its database
+    link_resilience.store_path = os.path.join(data_dir, "links.sqlite3")
+    qr.QR_CODES_DIR = os.path.join(data_dir, "qr_codes")
+    db = mongomock.MongoClient()["loadtest"]
+    db["users"].create_index([("email", 1)], unique=True)
+    app.dependency_overrides[get_user_collection] = lambda: db["users"]
+    app.dependency_overrides[get_url_collection] = lambda: db["urls"]
+    app.dependency_overrides[get_url_hash_collection] = lambda: db["url_hashes"]
+    app.dependency_overrides[get_domain_collection] = lambda: db["domains"]
+    app.dependency_overrides[get_job_collection] = lambda: db["jobs"]
+    return httpx.ASGITransport(app=app)
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Run the selected scenarios and build the report.
+
+    Args:
+        args (argparse.Namespace): The command line arguments.
+
+    Returns:
+        Dict[str, Any]: The JSON report.
+    """
+    transport: Optional[httpx.AsyncBaseTransport] = None
+    target = args.target
+    with ExitStack() as stack:
+        if args.in_process:
+            transport = in_process_transport(stack.enter_context(tempfile.TemporaryDirectory()))
+            target = "http://loadtest"
+
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=target, transport=transport, limits=limits, timeout=args.timeout
+        ) as client:
+            load_test = LoadTest(client, args)
+            await load_test.setup()
+            scenarios = []
+            for name in args.scenarios:
+                print(f"Running {name} for {args.duration} s ...")
+                summary = await load_test.run_scenario(name)
+                latency = summary["latency_ms"]
+                print(
+                    f"  {summary['requests']} requests, {summary['throughput_rps']:.1f} rps, "
+                    f"errors {summary['error_rate'] * 100:.2f}%, "
+                    f"p50 {latency['p50']:.2f} ms, p99 {latency['p99']:.2f} ms"
+                )
+                scenarios.append(summary)
+
+    return {
+        "target": "in-process" if args.in_process else target,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "seed_links": args.links,
+        "zipf_exponent": args.zipf_exponent,
+        "scenarios": scenarios,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Generate production-shaped load.")
+    parser.add_argument("--target", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="serve the app in-process with an in-memory database")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--links", type=int, default=200, help="seed links for redirects and QR fetches")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1)
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-pass")
+    parser.add_argument("--report-json", default="loadtest_report.json")
+    parser.add_argument("--report-html", default="loadtest_report.html")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(run(args))
+    with open(args.report_json, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    with open(args.report_html, "w") as report_file:
+        report_file.write(render_html(report))
+    print(f"Reports written to {args.report_json} and {args.report_html}")
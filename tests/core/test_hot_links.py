@@ -0,0 +1,76 @@
+# Importing required modules and functions
+import mongomock
+from app.core.hot_links import HeavyHitters, HotLinkCache
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+url_collection = db["urls"]
+
+
+def url_data(short_id: str) -> dict:
+    return {"short_id": short_id, "original_url": f"https://example.com/{short_id}", "domain": None}
+
+
+class TestHotLinks:
+    """
+    Test class for hot-link detection and the pinned cache tier.
+    """
+
+    @staticmethod
+    def test_heavy_hitters_find_skewed_keys():
+        """
+        Test that the tracker keeps the most frequent keys among a long tail.
+        """
+        tracker = HeavyHitters(k=3)
+
+        # Three viral keys interleaved with a long tail of one-off keys
+        for index in range(2000):
+            tracker.offer(f"viral{index % 3}")
+            tracker.offer(f"tail{index}")
+
+        # Asserting only the viral keys are tracked
+        assert sorted(key for key, _ in tracker.most_common()) == ["viral0", "viral1", "viral2"]
+
+    @staticmethod
+    def test_pinned_links_survive_long_tail_churn():
+        """
+        Test that hot links are pinned and not evicted by the LRU tier.
+        """
+        cache = HotLinkCache(top_k=1, size=2, ttl=60)
+
+        # Making one link hot
+        cache.put("hot", url_data("hot"))
+        for _ in range(10):
+            cache.record_hit("hot")
+        assert cache.hot_links() == [{"short_id": "hot", "estimated_hits": 10, "pinned": True}]
+
+        # Long-tail traffic fills and churns the LRU tier
+        for index in range(10):
+            cache.put(f"tail{index}", url_data(f"tail{index}"))
+            cache.record_hit(f"tail{index}")
+
+        # Asserting the hot link is still cached while old tail links are gone
+        assert cache.get("hot") == url_data("hot")
+        assert cache.get("tail0") is None
+        assert cache.get("tail9") == url_data("tail9")
+
+    @staticmethod
+    def test_snapshot_and_prewarm(tmp_path):
+        """
+        Test pre-warming the cache from a snapshot of hot links.
+        """
+        url_collection.insert_one({"_id": "hot", "u": "https://example.com/hot", "h": 0})
+        snapshot = str(tmp_path / "hot_links.json")
+
+        # Saving the hot links of one cache
+        cache = HotLinkCache(top_k=5, size=10, ttl=60)
+        for _ in range(3):
+            cache.record_hit("hot")
+        assert cache.save_snapshot(snapshot) == 1
+
+        # Pre-warming a fresh cache pins the link with its mapping
+        fresh = HotLinkCache(top_k=5, size=10, ttl=60)
+        assert fresh.prewarm(snapshot, url_collection) == 1
+        assert fresh.get("hot")["original_url"] == "https://example.com/hot"
+        assert fresh.hot_links()[0]["pinned"]
@@ -0,0 +1,198 @@
+# Importing required modules and functions
+from datetime import datetime, timedelta, timezone
+
+import urllib.request
+
+import mongomock
+import pytest
+from app.core import jobs, link_jobs
+from app.core.jobs import JobQueue, job_handler
+from app.core.link_jobs import (
+    UnsafeURLError,
+    _PublicRedirectHandler,
+    ensure_public_url,
+    extract_title,
+)
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+job_collection = db["jobs"]
+url_collection = db["urls"]
+
+
+class RecordingExecutor:
+    """
+    Executor stand-in recording submitted jobs instead of running them.
+    """
+
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, func, *args):
+        self.submitted.append(args)
+
+
+@job_handler("test_succeed")
+def succeed(payload, url_collection):
+    url_collection.insert_one({"_id": payload["short_id"]})
+
+
+@job_handler("test_fail")
+def fail(payload, url_collection):
+    raise RuntimeError("boom")
+
+
+class WriteCountingCollection:
+    """
+    Collection wrapper counting the write calls made to it.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.writes = 0
+
+    def __getattr__(self, name):
+        if name.startswith("insert"):
+            self.writes += 1
+        return getattr(self.collection, name)
+
+
+class TestJobs:
+    """
+    Test class for the background job queue.
+    """
+
+    @staticmethod
+    def test_enqueue_and_run_job():
+        """
+        Test that a job is persisted, submitted and marked done.
+        """
+        executor = RecordingExecutor()
+        queue = JobQueue(job_collection, url_collection, executor=executor)
+
+        # Enqueuing stores the job as pending and submits it
+        job_id = queue.enqueue("test_succeed", {"short_id": "job123"})
+        assert executor.submitted == [(job_id,)]
+        assert job_collection.find_one({"_id": job_id})["status"] == jobs.PENDING
+
+        # Running the job calls the handler and records the outcome
+        assert queue.run_job(job_id) == jobs.DONE
+        assert url_collection.find_one({"_id": "job123"})
+        assert job_collection.find_one({"_id": job_id})["attempts"] == 1
+
+        job = job_collection.find_one({"_id": job_id})
+        assert job["owner"] == jobs.WORKER_ID
+        assert job["finished_at"]
+
+        # A finished job is not run again
+        assert queue.run_job(job_id) is None
+
+    @staticmethod
+    def test_link_jobs_are_stored_in_one_write(monkeypatch):
+        """
+        Test that all post-processing jobs of a new link are stored with a single write.
+        """
+        monkeypatch.setattr(link_jobs, "LINK_CHECKS_ENABLED", True)
+        executor = RecordingExecutor()
+        counting_collection = WriteCountingCollection(job_collection)
+        queue = JobQueue(counting_collection, url_collection, executor=executor)
+
+        url_data = {"short_id": "many01", "original_url": "https://example.com/many"}
+        link_jobs.enqueue_link_post_processing(queue, url_data, "http://localhost/many01")
+
+        # Asserting the three jobs were written at once and all submitted
+        assert counting_collection.writes == 1
+        assert len(executor.submitted) == 3
+        kinds = {job["kind"] for job in job_collection.find({"payload.short_id": "many01"})}
+        assert kinds == {"render_qr", "check_url", "fetch_preview"}
+
+    @staticmethod
+    def test_failing_job_is_retried_then_failed(monkeypatch):
+        """
+        Test that failing jobs are retried up to their maximum attempts.
+        """
+        retries = []
+        queue = JobQueue(job_collection, url_collection, executor=RecordingExecutor())
+        monkeypatch.setattr(queue, "_retry_later", lambda job_id, delay: retries.append(delay))
+
+        job_id = queue.enqueue("test_fail", {}, max_attempts=2)
+
+        # The first failure schedules a retry, the second one is final
+        assert queue.run_job(job_id) == jobs.PENDING
+        assert retries == [jobs.JOB_RETRY_SECONDS]
+        assert queue.run_job(job_id) == jobs.FAILED
+        job = job_collection.find_one({"_id": job_id})
+        assert job["attempts"] == 2
+        assert job["error"] == "boom"
+
+    @staticmethod
+    def test_resume_resubmits_unfinished_jobs():
+        """
+        Test that jobs left running by a previous process are resubmitted.
+        """
+        job_collection.delete_many({})
+        job_collection.insert_one({"_id": "stale", "status": jobs.RUNNING})
+        executor = RecordingExecutor()
+        queue = JobQueue(job_collection, url_collection, executor=executor)
+
+        assert queue.resume() == 1
+        assert executor.submitted == [("stale",)]
+        assert job_collection.find_one({"_id": "stale"})["status"] == jobs.PENDING
+
+    @staticmethod
+    def test_resume_leaves_leased_jobs():
+        """
+        Test that jobs running under a live lease of another process are not resubmitted.
+        """
+        job_collection.delete_many({})
+        now = datetime.now(timezone.utc)
+        job_collection.insert_many(
+            [
+                {"_id": "leased", "status": jobs.RUNNING, "owner": "other", "lease_until": now + timedelta(minutes=1)},
+                {"_id": "expired", "status": jobs.RUNNING, "owner": "gone", "lease_until": now - timedelta(minutes=1)},
+            ]
+        )
+        executor = RecordingExecutor()
+        queue = JobQueue(job_collection, url_collection, executor=executor)
+
+        # Asserting only the job whose lease expired is resubmitted
+        assert queue.resume() == 1
+        assert executor.submitted == [("expired",)]
+        assert job_collection.find_one({"_id": "leased"})["status"] == jobs.RUNNING
+
+    @staticmethod
+    def test_extract_title():
+        """
+        Test extracting the preview title from an HTML page.
+        """
+        body = b"<html><head><TITLE>\n Fish &amp; Chips </TITLE></head></html>"
+        assert extract_title(body) == "Fish & Chips"
+        assert extract_title(b"<html></html>") is None
+
+    @staticmethod
+    def test_internal_urls_are_not_fetched():
+        """
+        Test that links and redirects to internal addresses are refused.
+        """
+        # Asserting public addresses are allowed
+        ensure_public_url("https://93.184.216.34/page")
+
+        # Asserting loopback, private, link-local and non-HTTP URLs are refused
+        for url in (
+            "http://127.0.0.1:27017/",
+            "http://localhost/",
+            "http://10.0.0.5/admin",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://[::1]/",
+            "file:///etc/passwd",
+        ):
+            with pytest.raises(UnsafeURLError):
+                ensure_public_url(url)
+
+        # Asserting a redirect to an internal address is refused as well
+        request = urllib.request.Request("https://93.184.216.34/page")
+        with pytest.raises(UnsafeURLError):
+            _PublicRedirectHandler().redirect_request(
+                request, None, 302, "Found", {}, "http://169.254.169.254/"
+            )
@@ -0,0 +1,50 @@
+# Importing required modules and functions
+import mongomock
+import pytest
+from app.core import links
+from app.core.links import shorten_link
+from app.database.crud import ShortIdTakenError, add_url_to_database
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+url_collection = db["urls"]
+url_hash_collection = db["url_hashes"]
+
+
+class TestLinks:
+    """
+    Test class for creating short links.
+    """
+
+    @staticmethod
+    def test_taken_short_id_is_drawn_again(monkeypatch):
+        """
+        Test that a short ID collision is retried with a new ID instead of failing.
+        """
+        add_url_to_database(
+            {"original_url": "https://example.com/taken", "short_id": "taken1", "hit_count": 0},
+            url_collection,
+            url_hash_collection,
+        )
+
+        # Adding another URL under the same short ID is a distinct conflict
+        with pytest.raises(ShortIdTakenError) as error:
+            add_url_to_database(
+                {"original_url": "https://example.com/other", "short_id": "taken1", "hit_count": 0},
+                url_collection,
+                url_hash_collection,
+            )
+        assert error.value.status_code == 409
+
+        # The first drawn ID collides, the second one is free
+        short_ids = iter(["taken1", "fresh1"])
+        monkeypatch.setattr(links, "create_short_id", lambda: next(short_ids))
+        url_data, created = shorten_link(
+            "https://example.com/other", None, url_collection, url_hash_collection
+        )
+
+        # Asserting the link was created under the new ID
+        assert created
+        assert url_data["short_id"] == "fresh1"
+        assert url_collection.find_one({"_id": "fresh1"})["u"] == "https://example.com/other"
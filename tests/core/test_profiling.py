@@ -0,0 +1,121 @@
+# Importing required modules and functions
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from pydantic import BaseModel, field_serializer
+
+from app.core import profiling
+
+
+def busy(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+class TestProfiling:
+    """
+    Test class for the profiling hooks.
+    """
+
+    @pytest.fixture(autouse=True)
+    def enable_profiling(self, monkeypatch):
+        """
+        Fixture to enable profiling and start from empty profile data.
+        """
+        monkeypatch.setattr(profiling, "PROFILING_ENABLED", True)
+        profiling.reset_profile()
+        yield
+        profiling.reset_profile()
+
+    @staticmethod
+    def test_disabled_hooks_are_no_ops(monkeypatch):
+        """
+        Test that disabled profiling leaves endpoints untouched.
+        """
+        monkeypatch.setattr(profiling, "PROFILING_ENABLED", False)
+
+        def endpoint():
+            return "ok"
+
+        # The endpoint is returned as is and stages share one no-op timer
+        assert profiling.profiled(endpoint) is endpoint
+        assert profiling.profile_stage("db") is profiling.profile_stage("auth")
+
+    @staticmethod
+    def test_sampled_request_is_profiled():
+        """
+        Test that stages are timed and sampled endpoints are profiled.
+        """
+        @profiling.profiled
+        def endpoint():
+            with profiling.profile_stage("db"):
+                busy(0.05)
+            return "ok"
+
+        # Simulating a sampled request trace opened by the middleware
+        trace = {"sampled": True, "stages": {}}
+        token = profiling._request_trace.set(trace)
+        try:
+            assert endpoint() == "ok"
+        finally:
+            profiling._request_trace.reset(token)
+
+        # Asserting the stage was timed and the profile was aggregated
+        assert "db" in trace["stages"]
+        profile = profiling.dump_profile()
+        assert profile["samples"] == 1
+        assert profile["functions"]
+
+        # Asserting the collapsed stacks are full stacks down to the busy loop
+        stack, count = profile["collapsed"][0].rsplit(" ", 1)
+        frames = stack.split(";")
+        assert int(count) > 0
+        assert frames[-1].startswith("busy ")
+        assert any(frame.startswith("endpoint ") for frame in frames)
+        assert any(frame.startswith("test_sampled_request_is_profiled ") for frame in frames)
+
+    @staticmethod
+    def test_record_slow_request():
+        """
+        Test recording a slow request with its stage breakdown.
+        """
+        entry = profiling.record_slow_request(
+            "GET", "/shorten/abc123", 0.5, {"db": 0.3, "auth": 0.1}
+        )
+
+        # Asserting the breakdown is reported in milliseconds
+        assert entry["stages_ms"] == {"db": 300.0, "auth": 100.0}
+        assert entry["other_ms"] == pytest.approx(100.0)
+        assert profiling.get_slow_requests() == [entry]
+
+    @staticmethod
+    def test_serialization_is_a_stage(monkeypatch):
+        """
+        Test that encoding the return value of a profiled endpoint is timed as its own stage.
+        """
+        monkeypatch.setattr(profiling, "SLOW_REQUEST_MS", 0)
+
+        class SlowToEncode(BaseModel):
+            status: str
+
+            @field_serializer("status")
+            def encode_status(self, value):
+                busy(0.05)
+                return value
+
+        app = FastAPI(default_response_class=profiling.ProfiledJSONResponse)
+        app.add_middleware(profiling.ProfilingMiddleware)
+
+        @app.get("/slow")
+        @profiling.profiled
+        def slow_endpoint():
+            return SlowToEncode(status="ok")
+
+        # Asserting the request log has a serialization stage
+        response = TestClient(app).get("/slow")
+        assert response.status_code == 200
+        entry = profiling.get_slow_requests()[-1]
+        assert entry["stages_ms"]["serialization"] >= 50
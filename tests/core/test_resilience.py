@@ -0,0 +1,166 @@
+# Importing required modules and functions
+import time
+from threading import Event
+
+import mongomock
+import pytest
+from fastapi import HTTPException
+
+from app.core.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, LinkResilience
+from app.database.local_cache import LocalLinkStore
+from app.database.schema import URL_HIT_COUNT, compact_url_document
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+url_collection = db["urls"]
+
+
+class UnavailableCollection:
+    """
+    Collection whose every call fails, like MongoDB during an outage.
+    """
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("MongoDB is unavailable")
+
+        return fail
+
+
+def add_url(short_id: str) -> dict:
+    url_data = {
+        "short_id": short_id,
+        "original_url": f"https://example.com/{short_id}",
+        "hit_count": 0,
+    }
+    url_collection.insert_one(compact_url_document(url_data))
+    return url_data
+
+
+class TestResilience:
+    """
+    Test class for the circuit breaker and the offline-first link store.
+    """
+
+    @staticmethod
+    def test_circuit_breaker_transitions():
+        """
+        Test that the breaker opens after repeated failures and recovers after a trial call.
+        """
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+        # Opening after two consecutive failures
+        breaker.record_failure()
+        assert breaker.allow_request() and breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN and not breaker.allow_request()
+
+        # A failed trial call opens the breaker again
+        time.sleep(0.06)
+        assert breaker.allow_request() and breaker.state == HALF_OPEN
+        breaker.record_failure()
+        assert not breaker.allow_request()
+
+        # A successful trial call closes it
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CLOSED
+
+    @staticmethod
+    def test_known_links_resolve_during_outage(tmp_path):
+        """
+        Test that stored links keep resolving while unknown ones fail fast.
+        """
+        resilience = LinkResilience(
+            str(tmp_path / "links.sqlite3"), CircuitBreaker(1, 60), fresh_seconds=0
+        )
+        url_data = add_url("resil1")
+
+        # Resolving once while MongoDB is up stores the mapping locally
+        assert resilience.resolve("resil1", url_collection)["original_url"] == url_data["original_url"]
+        resilience._executor.shutdown(wait=True)
+
+        # During the outage the stale mapping is still served
+        resilience.breaker.record_failure()
+        assert resilience.resolve("resil1", UnavailableCollection())["original_url"] == url_data["original_url"]
+
+        # Asserting unknown links fail with 503 instead of waiting on MongoDB
+        with pytest.raises(HTTPException) as error:
+            resilience.resolve("unknown", UnavailableCollection())
+        assert error.value.status_code == 503
+
+    @staticmethod
+    def test_hits_are_buffered_and_replayed(tmp_path):
+        """
+        Test that hits counted during an outage are written once MongoDB is back.
+        """
+        resilience = LinkResilience(
+            str(tmp_path / "links.sqlite3"), CircuitBreaker(1, 60), fresh_seconds=60
+        )
+        add_url("resil2")
+
+        # Counting hits while MongoDB is down, including hits of a link removed meanwhile
+        for _ in range(3):
+            resilience.count_hit("resil2", UnavailableCollection())
+        resilience._executor.shutdown(wait=True)
+        resilience.store.add_hits("removed", 2)
+        assert resilience.breaker.state == OPEN
+        assert resilience.store.pending_hits() == 5
+
+        # Replaying once it is back drops the hits of the missing link
+        resilience.breaker.record_success()
+        assert resilience.replay_hits(url_collection) == 3
+        assert resilience.breaker.state == CLOSED
+
+        # Asserting the buffered hits were written and the buffer emptied
+        assert url_collection.find_one({"_id": "resil2"})[URL_HIT_COUNT] == 3
+        assert resilience.store.pending_hits() == 0
+
+    @staticmethod
+    def test_hits_do_not_wait_on_the_database(tmp_path):
+        """
+        Test that counting a hit returns while the database stalls and is written afterwards.
+        """
+        resilience = LinkResilience(
+            str(tmp_path / "links.sqlite3"), CircuitBreaker(1, 60), fresh_seconds=60
+        )
+        add_url("resil3")
+        released = Event()
+
+        class StalledCollection:
+            def __getattr__(self, name):
+                def stall(*args, **kwargs):
+                    released.wait(5)
+                    return getattr(url_collection, name)(*args, **kwargs)
+
+                return stall
+
+        # Asserting the hit is counted without waiting on the stalled database
+        started = time.perf_counter()
+        resilience.count_hit("resil3", StalledCollection())
+        assert time.perf_counter() - started < 0.5
+
+        # Once the database answers, the buffered hit is written
+        released.set()
+        resilience._executor.shutdown(wait=True)
+        assert url_collection.find_one({"_id": "resil3"})[URL_HIT_COUNT] == 1
+        assert resilience.store.pending_hits() == 0
+
+    @staticmethod
+    def test_local_store_evicts_oldest_links(tmp_path):
+        """
+        Test that the local store keeps only the most recently fetched mappings.
+        """
+        store = LocalLinkStore(str(tmp_path / "links.sqlite3"), max_links=3, prune_every=2)
+        for index in range(6):
+            store.put({"short_id": f"evict{index}", "original_url": "https://example.com/"})
+        store.add_hits("evict0", 2)
+
+        # Asserting the oldest mappings were evicted but buffered hits were kept
+        assert store.prune() == 0
+        assert [store.get(f"evict{index}") is not None for index in range(6)] == [
+            False, False, False, True, True, True
+        ]
+        assert store.pending_hits() == 2
@@ -1,10 +1,17 @@
 # Importing required modules and functions
 import jwt
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+from app.core import security
 from app.core.security import (
     JWT_SECRET,
     JWT_ALGORITHM,
+    Keyring,
     encode_jwt_token,
     decode_jwt_token,
+    decode_refresh_token,
+    issue_tokens,
     verify_jwt,
 )
 
@@ -34,7 +41,13 @@ class TestSecurity:
         Test decoding a JWT token.
         """
         # Sample data to be encoded in the JWT token
-        payload = {"email": "test@example.com"}
+        now = datetime.now(timezone.utc)
+        payload = {
+            "email": "test@example.com",
+            "sub": "test@example.com",
+            "iat": now,
+            "exp": now + timedelta(minutes=5),
+        }
 
         # Encoding the payload using the jwt library
         token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
@@ -52,7 +65,13 @@ class TestSecurity:
         Test verifying a JWT token.
         """
         # Sample data to be encoded in the JWT token
-        payload = {"email": "test@example.com"}
+        now = datetime.now(timezone.utc)
+        payload = {
+            "email": "test@example.com",
+            "sub": "test@example.com",
+            "iat": now,
+            "exp": now + timedelta(minutes=5),
+        }
 
         # Encoding the payload using the jwt library
         token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
@@ -62,3 +81,60 @@ class TestSecurity:
 
         # Asserting that the token is verified
         assert is_verified
+
+    @staticmethod
+    def test_legacy_token_is_rejected():
+        """
+        Test that tokens without expiry, issue time or subject are rejected.
+        """
+        # A token as issued before claims were slimmed, carrying the user document
+        payload = {"email": "test@example.com", "password": "$2b$12$hash"}
+        token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+        # Asserting the token is neither verified nor decoded
+        assert not verify_jwt(token)
+        with pytest.raises(HTTPException):
+            decode_jwt_token(token)
+
+    @staticmethod
+    def test_issue_tokens_with_minimal_claims():
+        """
+        Test that access tokens only carry the subject, issue and expiry times.
+        """
+        tokens = issue_tokens("test@example.com")
+
+        # Asserting the access token claims and the kid header
+        access = decode_jwt_token(tokens["token"])
+        assert set(access) == {"sub", "iat", "exp"}
+        assert access["sub"] == "test@example.com"
+        assert access["exp"] > access["iat"]
+        assert jwt.get_unverified_header(tokens["token"])["kid"] == security.keyring.active_kid
+
+        # Asserting refresh and access tokens are not interchangeable
+        assert verify_jwt(tokens["token"])
+        assert not verify_jwt(tokens["refresh_token"])
+        assert decode_refresh_token(tokens["refresh_token"])["sub"] == "test@example.com"
+        with pytest.raises(HTTPException):
+            decode_refresh_token(tokens["token"])
+
+    @staticmethod
+    def test_key_rotation(monkeypatch):
+        """
+        Test that tokens signed with a rotated-out key are still verified.
+        """
+        old_ring = Keyring(JWT_ALGORITHM, {"old": "old-secret"}, "old")
+        monkeypatch.setattr(security, "keyring", old_ring)
+        old_token = issue_tokens("test@example.com")["token"]
+
+        # Rotating to a new active key while keeping the old one for verification
+        new_ring = Keyring(JWT_ALGORITHM, {"old": "old-secret", "new": "new-secret"}, "new")
+        monkeypatch.setattr(security, "keyring", new_ring)
+        new_token = issue_tokens("test@example.com")["token"]
+
+        assert jwt.get_unverified_header(new_token)["kid"] == "new"
+        assert verify_jwt(old_token)
+        assert verify_jwt(new_token)
+
+        # Removing the old key invalidates its tokens
+        monkeypatch.setattr(security, "keyring", Keyring(JWT_ALGORITHM, {"new": "new-secret"}, "new"))
+        assert not verify_jwt(old_token)
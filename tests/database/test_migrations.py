@@ -0,0 +1,66 @@
+# Importing required modules and functions
+import mongomock
+from app.database.migrations import backfill_url_hashes, migrate_urls_to_compact_schema
+from app.database.schema import url_hash
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+url_collection = db["urls"]
+
+
+class TestMigrations:
+    """
+    Test class for the urls collection migrations.
+    """
+
+    @staticmethod
+    def test_migrate_urls_to_compact_schema():
+        """
+        Test rewriting legacy url documents to the compact schema.
+        """
+        # Legacy documents with derived fields and a unique original_url index
+        url_collection.create_index([("original_url", 1)], unique=True)
+        for index in range(5):
+            url_collection.insert_one(
+                {
+                    "original_url": f"https://example.com/{index}",
+                    "short_url": f"http://localhost:8000/shorten/id{index}",
+                    "short_id": f"id{index}",
+                    "hit_count": index,
+                    "qr_code": f"qr_codes/id{index}.png",
+                    "qr_url": f"http://localhost:8000/shorten/qr/id{index}",
+                }
+            )
+
+        # Migrating in batches smaller than the collection
+        assert migrate_urls_to_compact_schema(url_collection, batch_size=2) == 5
+
+        # Asserting every document was rewritten to the compact schema
+        assert url_collection.count_documents({}) == 5
+        assert url_collection.find_one({"_id": "id3"}) == {
+            "_id": "id3",
+            "u": "https://example.com/3",
+            "h": 3,
+        }
+
+        # Running the migration again is a no-op
+        assert migrate_urls_to_compact_schema(url_collection) == 0
+
+    @staticmethod
+    def test_backfill_url_hashes():
+        """
+        Test creating the dedupe hashes of existing urls.
+        """
+        url_hash_collection = db["url_hashes"]
+
+        # Backfilling in batches smaller than the collection
+        assert backfill_url_hashes(url_collection, url_hash_collection, batch_size=2) == 5
+
+        # Asserting each url is found by the hash of its original URL
+        hash_document = url_hash_collection.find_one({"_id": url_hash("https://example.com/3")})
+        assert hash_document["s"] == "id3"
+
+        # Running the backfill again is a no-op
+        assert backfill_url_hashes(url_collection, url_hash_collection) == 5
+        assert url_hash_collection.count_documents({}) == 5
@@ -0,0 +1,140 @@
+# Importing required modules and functions
+import time
+
+import mongomock
+import pytest
+from fastapi import HTTPException
+from app.database.schema import url_hash
+from app.database.crud import (
+    add_url_to_database,
+    add_urls_to_database,
+    get_url_from_database,
+    increment_hit_count,
+)
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+url_collection = db["urls"]
+url_hash_collection = db["url_hashes"]
+
+
+class TestUrlCrud:
+    """
+    Test class for CRUD operations on the url collection.
+    """
+
+    @staticmethod
+    def test_add_url_stores_compact_document():
+        """
+        Test that urls are stored with short field names keyed by short ID.
+        """
+        # Sample url data to be added to the database
+        url_data = {"original_url": "https://example.com/", "short_id": "abc123", "hit_count": 0}
+
+        # Adding the url to the database
+        response = add_url_to_database(url_data, url_collection, url_hash_collection)
+        assert response == url_data
+
+        # Asserting only the compact fields are stored, plus the dedupe hash
+        document = url_collection.find_one({"_id": "abc123"})
+        assert document == {"_id": "abc123", "u": "https://example.com/", "h": 0}
+        hash_document = url_hash_collection.find_one({"_id": url_hash("https://example.com/")})
+        assert hash_document["s"] == "abc123"
+
+        # Adding the same original URL again is rejected
+        with pytest.raises(HTTPException) as error:
+            add_url_to_database(
+                {**url_data, "short_id": "def456"}, url_collection, url_hash_collection
+            )
+        assert error.value.status_code == 409
+
+    @staticmethod
+    def test_add_url_takes_over_orphan_hash():
+        """
+        Test that a hash left by an interrupted insert does not block the URL.
+        """
+        # A hash pointing to a url that was never inserted
+        url_hash_collection.insert_one({"_id": url_hash("https://example.net/"), "s": "gone00"})
+
+        url_data = {"original_url": "https://example.net/", "short_id": "new000", "hit_count": 0}
+        add_url_to_database(url_data, url_collection, url_hash_collection)
+
+        # Asserting the hash now points to the new url
+        assert url_hash_collection.find_one({"_id": url_hash("https://example.net/")})["s"] == "new000"
+
+    @staticmethod
+    def test_add_url_keeps_hash_of_insert_in_flight():
+        """
+        Test that a recent claim without a url is not taken over by a concurrent insert.
+        """
+        # A hash claimed just now by a request that has not inserted its url yet
+        url_hash_collection.insert_one(
+            {"_id": url_hash("https://example.org/race"), "s": "first0", "c": time.time()}
+        )
+
+        # A second request shortening the same URL is rejected
+        url_data = {"original_url": "https://example.org/race", "short_id": "second", "hit_count": 0}
+        with pytest.raises(HTTPException) as error:
+            add_url_to_database(url_data, url_collection, url_hash_collection)
+        assert error.value.status_code == 409
+
+        # Asserting the hash still belongs to the first request
+        assert url_hash_collection.find_one({"_id": url_hash("https://example.org/race")})["s"] == "first0"
+        assert url_collection.find_one({"_id": "second"}) is None
+
+    @staticmethod
+    def test_get_url_and_increment_hit_count():
+        """
+        Test retrieving a url by short ID and original URL and counting hits.
+        """
+        url_collection.insert_one({"_id": "xyz789", "u": "https://example.org/", "h": 0})
+        url_hash_collection.insert_one({"_id": url_hash("https://example.org/"), "s": "xyz789"})
+
+        # Incrementing the hit count of the url
+        increment_hit_count("xyz789", url_collection)
+
+        # Asserting both lookups return the expanded url data
+        by_short_id = get_url_from_database({"short_id": "xyz789"}, url_collection)
+        by_original_url = get_url_from_database(
+            {"original_url": "https://example.org/"},
+            url_collection,
+            url_hash_collection=url_hash_collection,
+        )
+        assert by_short_id == by_original_url == {
+            "short_id": "xyz789",
+            "original_url": "https://example.org/",
+            "hit_count": 1,
+            "domain": None,
+            "reachable": None,
+            "flagged": False,
+            "title": None,
+        }
+
+    @staticmethod
+    def test_add_urls_in_bulk():
+        """
+        Test that batches skip existing original URLs and report taken short IDs.
+        """
+        add_url_to_database(
+            {"original_url": "https://example.com/bulk0", "short_id": "bulk00", "hit_count": 0},
+            url_collection,
+            url_hash_collection,
+        )
+        urls = [
+            {"original_url": "https://example.com/bulk0", "short_id": "bulk01", "hit_count": 0},
+            {"original_url": "https://example.com/bulk1", "short_id": "bulk02", "hit_count": 4},
+            {"original_url": "https://example.com/bulk1", "short_id": "bulk03", "hit_count": 0},
+            {"original_url": "https://example.com/bulk2", "short_id": "bulk00", "hit_count": 0},
+        ]
+
+        # Adding the batch
+        result = add_urls_to_database(urls, url_collection, url_hash_collection)
+
+        # Asserting only the new URL with a free short ID was added
+        assert [url["short_id"] for url in result["added"]] == ["bulk02"]
+        assert sorted(url["short_id"] for url in result["existing"]) == ["bulk01", "bulk03"]
+        assert [url["original_url"] for url in result["conflicts"]] == ["https://example.com/bulk2"]
+        assert url_collection.find_one({"_id": "bulk02"})["h"] == 4
+        # The hash of the conflicting URL is released
+        assert url_hash_collection.find_one({"_id": url_hash("https://example.com/bulk2")}) is None
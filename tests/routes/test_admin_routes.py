@@ -0,0 +1,72 @@
+# Importing required modules and functions
+import mongomock
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core import security
+from app.core.domains import domain_registry
+from app.core.security import issue_tokens
+from app.database.connection import get_domain_collection
+
+# Setting up the mock MongoDB client and database
+test_client = mongomock.MongoClient()
+db = test_client["testDB"]
+domain_collection = db["domains"]
+
+# Creating a TestClient instance for testing
+client = TestClient(app)
+
+
+def auth_headers(email: str) -> dict:
+    return {"Authorization": f"Bearer {issue_tokens(email)['token']}"}
+
+
+class TestAdmin:
+    """
+    Test class for the access control of Admin routes.
+    """
+
+    @staticmethod
+    def test_admin_routes_require_operator(monkeypatch):
+        """
+        Test that only operators listed in ADMIN_EMAILS can use admin routes.
+        """
+        monkeypatch.setattr(security, "ADMIN_EMAILS", {"ops@example.com"})
+
+        # A registered user with a valid token is refused
+        response = client.get("/admin/slow-requests", headers=auth_headers("user@example.com"))
+        assert response.status_code == 403
+        response = client.delete("/admin/profile", headers=auth_headers("user@example.com"))
+        assert response.status_code == 403
+
+        # Asserting an operator is allowed
+        response = client.get("/admin/slow-requests", headers=auth_headers("Ops@example.com"))
+        assert response.status_code == 200
+
+    @staticmethod
+    def test_domain_base_url_must_match_host(monkeypatch):
+        """
+        Test that a domain is only registered with a base URL on its own host.
+        """
+        monkeypatch.setattr(security, "ADMIN_EMAILS", {"ops@example.com"})
+        monkeypatch.setitem(app.dependency_overrides, get_domain_collection, lambda: domain_collection)
+        headers = auth_headers("ops@example.com")
+
+        try:
+            # Asserting a base URL on another host is refused
+            response = client.post(
+                "/admin/domains",
+                json={"host": "go.example.com", "base_url": "https://links.example.com/s"},
+                headers=headers,
+            )
+            assert response.status_code == 422
+
+            # Asserting a base URL on the host itself is accepted, whatever its case and port
+            response = client.post(
+                "/admin/domains",
+                json={"host": "Go.Example.com:443", "base_url": "https://go.example.com/s"},
+                headers=headers,
+            )
+            assert response.status_code == 201
+        finally:
+            domain_collection.delete_many({})
+            domain_registry.load(domain_collection)
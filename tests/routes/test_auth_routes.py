@@ -2,8 +2,9 @@
 from fastapi.testclient import TestClient
 from app.main import app  # Importing the main FastAPI app
 from app.database.connection import (
+    get_refresh_token_collection,
     get_user_collection,
-)  # Importing the user collection dependency
+)  # Importing the collection dependencies
 
 import mongomock  # Importing mongomock for mocking MongoDB
 
@@ -11,6 +12,7 @@ import mongomock  # Importing mongomock for mocking MongoDB
 test_client = mongomock.MongoClient()
 db = test_client["testDB"]  # Renamed to a more descriptive name
 user_collection = db["users"]
+refresh_token_collection = db["refresh_tokens"]
 
 # Creating a unique index on the 'email' field
 user_collection.create_index([("email", 1)], unique=True)
@@ -23,8 +25,16 @@ def get_user_test_collection():
     return user_collection
 
 
-# Override the get_user_collection dependency to use the mock collection
+def get_refresh_token_test_collection():
+    """
+    Returns the mock refresh_tokens collection for testing.
+    """
+    return refresh_token_collection
+
+
+# Override the collection dependencies to use the mock collections
 app.dependency_overrides[get_user_collection] = get_user_test_collection
+app.dependency_overrides[get_refresh_token_collection] = get_refresh_token_test_collection
 
 # Creating a TestClient instance for testing
 client = TestClient(app)
@@ -77,8 +87,58 @@ class TestAuth:
 
         # Asserting that a token is present in the response data
         assert "token" in data
+        assert "refresh_token" in data
 
         # Sending a POST request to login with wrong password
         response = client.post("/auth/login", json={"email": "test@example.com", "password":"pass123"})
         assert response.status_code == 400
-        assert response.json() == {"detail": "Incorrect Email or Password"}
\ No newline at end of file
+        assert response.json() == {"detail": "Incorrect Email or Password"}
+
+    def test_refresh(self):
+        """
+        Test exchanging a refresh token for new tokens.
+        """
+        # Sending a POST request to login the user
+        response = client.post("/auth/login", json={"email": "test@example.com", "password":"pass321"})
+        data = response.json()
+
+        # Sending a POST request with the refresh token
+        response = client.post("/auth/refresh", json={"refresh_token": data["refresh_token"]})
+        assert response.status_code == 200
+        assert "token" in response.json()
+        assert "refresh_token" in response.json()
+
+        # Access tokens are rejected as refresh tokens
+        response = client.post("/auth/refresh", json={"refresh_token": data["token"]})
+        assert response.status_code == 401
+
+    def test_refresh_token_reuse_revokes_session(self):
+        """
+        Test that a refresh token works once and that replaying it ends the session.
+        """
+        # Sending a POST request to login the user and rotating its refresh token
+        response = client.post("/auth/login", json={"email": "test@example.com", "password":"pass321"})
+        first = response.json()["refresh_token"]
+        response = client.post("/auth/refresh", json={"refresh_token": first})
+        assert response.status_code == 200
+        second = response.json()["refresh_token"]
+
+        # Replaying the first token is refused and revokes the rotated one too
+        response = client.post("/auth/refresh", json={"refresh_token": first})
+        assert response.status_code == 401
+        response = client.post("/auth/refresh", json={"refresh_token": second})
+        assert response.status_code == 401
+
+    def test_logout(self):
+        """
+        Test that logging out revokes the refresh token.
+        """
+        response = client.post("/auth/login", json={"email": "test@example.com", "password":"pass321"})
+        refresh_token = response.json()["refresh_token"]
+
+        response = client.post("/auth/logout", json={"refresh_token": refresh_token})
+        assert response.status_code == 200
+
+        # Asserting the refresh token can no longer be exchanged
+        response = client.post("/auth/refresh", json={"refresh_token": refresh_token})
+        assert response.status_code == 401
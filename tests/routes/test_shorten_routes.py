@@ -1,9 +1,27 @@
 # Importing required modules and functions
+import io
+import os
+import zipfile
 from fastapi.testclient import TestClient
 import pytest
 from app.main import app
-from app.database.connection import get_user_collection, get_url_collection
+from app.database.connection import (
+    get_user_collection,
+    get_url_collection,
+    get_url_hash_collection,
+    get_domain_collection,
+    get_job_collection,
+    get_refresh_token_collection,
+)
 from app.core.security import hash_password
+from app.routes import shorten_url as shorten_url_routes
+from app.core.jobs import JobQueue, get_job_queue
+from app.core.domains import domain_registry
+from app.core import link_jobs
+from app.core import qr
+from app.core.qr import render_qr_png
+from app.core.resilience import link_resilience
+from app.database.local_cache import LocalLinkStore
 
 import mongomock
 
@@ -12,6 +30,10 @@ test_client = mongomock.MongoClient()
 db = test_client["testDB"]  # Renamed to a more descriptive name
 user_collection = db["users"]
 url_collection = db["urls"]
+url_hash_collection = db["url_hashes"]
+domain_collection = db["domains"]
+job_collection = db["jobs"]
+refresh_token_collection = db["refresh_tokens"]
 
 # Creating a unique index on the 'email' field
 user_collection.create_index([("email", 1)], unique=True)
@@ -31,14 +53,68 @@ def get_url_test_collection():
     return url_collection
 
 
+def get_url_hash_test_collection():
+    """
+    Returns the mock url_hashes collection for testing.
+    """
+    return url_hash_collection
+
+
+def get_domain_test_collection():
+    """
+    Returns the mock domains collection for testing.
+    """
+    return domain_collection
+
+
+def get_job_test_collection():
+    """
+    Returns the mock jobs collection for testing.
+    """
+    return job_collection
+
+
+class InlineExecutor:
+    """
+    Executor stand-in running jobs in the request, so they finish within their test.
+    """
+
+    def submit(self, func, *args):
+        func(*args)
+
+
+def get_test_job_queue():
+    """
+    Returns a job queue running its jobs inline for testing.
+    """
+    return JobQueue(job_collection, url_collection, executor=InlineExecutor())
+
+
 # Override dependencies for testing
 app.dependency_overrides[get_user_collection] = get_user_test_collection
 app.dependency_overrides[get_url_collection] = get_url_test_collection
+app.dependency_overrides[get_url_hash_collection] = get_url_hash_test_collection
+app.dependency_overrides[get_domain_collection] = get_domain_test_collection
+app.dependency_overrides[get_job_collection] = get_job_test_collection
+app.dependency_overrides[get_refresh_token_collection] = lambda: refresh_token_collection
+app.dependency_overrides[get_job_queue] = get_test_job_queue
 
 # Creating a TestClient instance for testing
 client = TestClient(app)
 
 
+class UnavailableCollection:
+    """
+    Collection whose every call fails, like MongoDB during an outage.
+    """
+
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("MongoDB is unavailable")
+
+        return fail
+
+
 class TestShorten:
     """
     Test class for Shorten routes.
@@ -60,11 +136,15 @@ class TestShorten:
         user_collection.delete_many({})
 
     @pytest.fixture(autouse=True)
-    def setup_and_teardown(self):
+    def setup_and_teardown(self, tmp_path, monkeypatch):
         """
         Fixture to set up and tear down the test database.
         """
-        # Setup: Create test users
+        # Setup: Create test users and give each test its own local link store and QR codes
+        monkeypatch.setattr(
+            link_resilience, "_store", LocalLinkStore(str(tmp_path / "links.sqlite3"))
+        )
+        monkeypatch.setattr(qr, "QR_CODES_DIR", str(tmp_path / "qr_codes"))
         self.clear_test_db()
         self.create_test_user("user@example.com", "pass321")
         yield
@@ -137,3 +217,207 @@ class TestShorten:
         response = client.get(f"/shorten/{data['short_id']}", allow_redirects=False)
         assert response.status_code == 307
         assert response.headers["location"] == "https://google.com/"
+
+
+    def test_multi_domain_short_urls(self):
+        """
+        Test creating and resolving links on a branded short domain.
+        """
+        # Registering a branded domain and reloading the domain table
+        domain_collection.insert_one(
+            {"_id": "go.example.com", "base_url": "https://go.example.com/s"}
+        )
+        domain_registry.load(domain_collection)
+
+        try:
+            # Login to get the token
+            response = client.post(
+                "/auth/login", json={"email": "user@example.com", "password": "pass321"}
+            )
+            token = response.json()["token"]
+
+            # Shorten a URL on the branded domain
+            response = client.post(
+                "/shorten/",
+                json={"original_url": "https://example.com/campaign", "domain": "go.example.com"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 200
+            data = response.json()
+            assert data["short_url"] == f"https://go.example.com/s/{data['short_id']}"
+
+            # Unknown domains are rejected
+            response = client.post(
+                "/shorten/",
+                json={"original_url": "https://example.com/campaign", "domain": "unknown.com"},
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            assert response.status_code == 400
+
+            # The link resolves on its own domain only
+            response = client.get(
+                f"/shorten/{data['short_id']}",
+                headers={"Host": "go.example.com"},
+                follow_redirects=False,
+            )
+            assert response.status_code == 307
+            assert response.headers["location"] == "https://example.com/campaign"
+
+            response = client.get(f"/shorten/{data['short_id']}", follow_redirects=False)
+            assert response.status_code == 404
+        finally:
+            domain_collection.delete_many({})
+            domain_registry.load(domain_collection)
+
+    def test_export_qr_codes(self):
+        """
+        Test exporting the QR codes of several short URLs as a ZIP archive.
+        """
+        # Login to get the token
+        response = client.post(
+            "/auth/login", json={"email": "user@example.com", "password": "pass321"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        # Make two Short URLs to export
+        short_ids = []
+        for path in ("first", "second"):
+            response = client.post(
+                "/shorten/",
+                json={"original_url": f"https://example.com/{path}"},
+                headers=headers,
+            )
+            assert response.status_code == 200
+            short_ids.append(response.json()["short_id"])
+
+        # Make the request to export their QR codes
+        response = client.post(
+            "/shorten/qr/export", json={"short_ids": short_ids}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/zip"
+
+        # Asserting the archive holds one PNG image per short ID
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert sorted(archive.namelist()) == sorted(f"{short_id}.png" for short_id in short_ids)
+            for name in archive.namelist():
+                assert archive.read(name).startswith(b"\x89PNG")
+
+    def test_export_qr_codes_is_bounded(self, monkeypatch):
+        """
+        Test that an export selects its links explicitly and is capped in size.
+        """
+        # Login to get the token
+        response = client.post(
+            "/auth/login", json={"email": "user@example.com", "password": "pass321"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+        monkeypatch.setattr(shorten_url_routes, "QR_EXPORT_MAX_LINKS", 1)
+
+        # Asserting exactly one of short_ids and domain must be given
+        for payload in ({}, {"short_ids": ["a"], "domain": "testserver"}):
+            response = client.post("/shorten/qr/export", json=payload, headers=headers)
+            assert response.status_code == 422
+
+        # Asserting exports over the limit are refused, by short ID or by domain
+        response = client.post(
+            "/shorten/qr/export", json={"short_ids": ["a", "b"]}, headers=headers
+        )
+        assert response.status_code == 413
+        for path in ("bounded1", "bounded2"):
+            client.post(
+                "/shorten/", json={"original_url": f"https://example.com/{path}"}, headers=headers
+            )
+        response = client.post(
+            "/shorten/qr/export", json={"domain": domain_registry.default_host}, headers=headers
+        )
+        assert response.status_code == 413
+
+    def test_flagged_link_is_blocked(self, monkeypatch):
+        """
+        Test that a link flagged after it was redirected stops redirecting.
+        """
+        # Login to get the token
+        response = client.post(
+            "/auth/login", json={"email": "user@example.com", "password": "pass321"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['token']}"}
+
+        # Make a Short URL and redirect once so its mapping is cached
+        response = client.post(
+            "/shorten/", json={"original_url": "https://blocked.example/page"}, headers=headers
+        )
+        short_id = response.json()["short_id"]
+        response = client.get(f"/shorten/{short_id}", follow_redirects=False)
+        assert response.status_code == 307
+
+        # Running the link check with the host blocked
+        monkeypatch.setattr(link_jobs, "BLOCKED_HOSTS", {"blocked.example"})
+        monkeypatch.setattr(link_jobs, "fetch_url", lambda url, method="GET", max_bytes=0: (200, b""))
+        link_jobs.check_url(
+            {"short_id": short_id, "original_url": "https://blocked.example/page"}, url_collection
+        )
+
+        # Asserting the next redirect sees the flag
+        response = client.get(f"/shorten/{short_id}", follow_redirects=False)
+        assert response.status_code == 403
+
+    def test_qr_code_of_branded_link_in_new_worker(self):
+        """
+        Test that an on-demand QR code encodes the branded domain before the domain table is loaded.
+        """
+        # A branded link whose QR code was never rendered
+        domain_collection.insert_one(
+            {"_id": "qr.example.com", "base_url": "https://qr.example.com/s"}
+        )
+        url_collection.insert_one({"_id": "brand1", "u": "https://example.com/brand", "h": 0, "d": "qr.example.com"})
+        # A new worker has not loaded the domain table yet
+        domain_registry._domains = {}
+        domain_registry._loaded_at = None
+
+        try:
+            assert not os.path.exists(qr.qr_code_path("brand1"))
+            response = client.get("/shorten/qr/brand1")
+
+            # Asserting the image encodes the branded short URL
+            assert response.status_code == 200
+            assert response.content == render_qr_png("https://qr.example.com/s/brand1")
+        finally:
+            domain_collection.delete_many({})
+            domain_registry.load(domain_collection)
+
+    def test_links_wait_for_the_domain_table(self):
+        """
+        Test that links are not created in the default domain while the domain table cannot be loaded.
+        """
+        # Login to get the token
+        response = client.post(
+            "/auth/login", json={"email": "user@example.com", "password": "pass321"}
+        )
+        headers = {"Authorization": f"Bearer {response.json()['token']}", "Host": "go2.example.com"}
+
+        domain_collection.insert_one(
+            {"_id": "go2.example.com", "base_url": "https://go2.example.com/s"}
+        )
+        # A new worker whose first load of the domain table fails
+        domain_registry._domains = {}
+        domain_registry._loaded_at = None
+        app.dependency_overrides[get_domain_collection] = UnavailableCollection
+
+        try:
+            response = client.post(
+                "/shorten/", json={"original_url": "https://example.com/wait"}, headers=headers
+            )
+            assert response.status_code == 503
+
+            # Once MongoDB is back the link is created in the branded domain
+            app.dependency_overrides[get_domain_collection] = get_domain_test_collection
+            response = client.post(
+                "/shorten/", json={"original_url": "https://example.com/wait"}, headers=headers
+            )
+            assert response.status_code == 200
+            assert response.json()["short_url"].startswith("https://go2.example.com/s/")
+        finally:
+            app.dependency_overrides[get_domain_collection] = get_domain_test_collection
+            domain_collection.delete_many({})
+            domain_registry.load(domain_collection)
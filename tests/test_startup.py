@@ -0,0 +1,61 @@
+# Importing required modules and functions
+import time
+from threading import Event
+
+import mongomock
+from fastapi.testclient import TestClient
+
+from app import main
+from benchmarks.importtime import measure_first_request
+
+# Generous bounds so that only a regression such as connecting to MongoDB
+# at import or startup time fails, not a slow machine
+IMPORT_BUDGET_S = 3.0
+STARTUP_BUDGET_S = 1.0
+FIRST_REQUEST_BUDGET_S = 1.0
+
+
+class TestStartup:
+    """
+    Test class for the cold start of the API.
+    """
+
+    @staticmethod
+    def test_cold_start():
+        """
+        Test that importing the app is fast and leaves heavy modules for first use.
+        """
+        # Importing the app and serving one redirect in a fresh interpreter
+        startup = measure_first_request("app.main")
+
+        # Asserting the heavy modules were not imported and the times are within budget
+        assert startup["lazy_modules_loaded"] == []
+        assert startup["status"] == 404
+        assert startup["import_s"] < IMPORT_BUDGET_S
+        assert startup["startup_s"] < STARTUP_BUDGET_S
+        assert startup["first_request_s"] < FIRST_REQUEST_BUDGET_S
+
+    @staticmethod
+    def test_startup_does_not_wait_on_the_database(monkeypatch):
+        """
+        Test that the app serves requests while MongoDB is still unreachable.
+        """
+        db = mongomock.MongoClient()["startupDB"]
+        released = Event()
+
+        def stalled_job_collection():
+            released.wait(5)
+            return db["jobs"]
+
+        monkeypatch.setattr(main, "get_job_collection", stalled_job_collection)
+        monkeypatch.setattr(main, "get_url_collection", lambda: db["urls"])
+
+        # Asserting the app starts and answers while resuming jobs is blocked
+        started = time.perf_counter()
+        with TestClient(main.app) as client:
+            assert client.get("/healthchecker").status_code == 200
+            assert time.perf_counter() - started < STARTUP_BUDGET_S
+
+            # Jobs are resumed once the database answers
+            released.set()
+            main.app.state.warm_up.result(timeout=5)
@@ -0,0 +1,86 @@
+# Importing required modules and functions
+import json
+
+import mongomock
+from app.database.crud import add_url_to_database
+from app.tools.bulk import Checkpoint, export_links, import_links
+
+# Setting up the mock MongoDB client and databases
+test_client = mongomock.MongoClient()
+source_db = test_client["sourceDB"]
+target_db = test_client["targetDB"]
+
+
+def add_links(db, count: int) -> None:
+    for index in range(count):
+        url_data = {
+            "original_url": f"https://example.com/{index}",
+            "short_id": f"link{index:02d}",
+            "hit_count": index,
+        }
+        add_url_to_database(url_data, db["urls"], db["url_hashes"])
+
+
+def import_file(db, path, **kwargs) -> dict:
+    return import_links(db["urls"], db["url_hashes"], db["domains"], str(path), **kwargs)
+
+
+class TestBulk:
+    """
+    Test class for the bulk import and export tools.
+    """
+
+    @staticmethod
+    def test_export_and_import_round_trip(tmp_path):
+        """
+        Test that links keep their short ID and hit count between databases.
+        """
+        add_links(source_db, 25)
+        path = tmp_path / "links.ndjson"
+
+        # Exporting in small batches
+        exported = export_links(source_db["urls"], source_db["domains"], str(path), batch_size=10)
+        assert exported == 25
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [record["short_id"] for record in records] == [f"link{index:02d}" for index in range(25)]
+        assert not Checkpoint(str(path)).load()
+
+        # Importing into an empty database
+        totals = import_file(target_db, path, batch_size=10, workers=2)
+        assert totals == {"added": 25, "existing": 0, "conflicts": 0, "invalid": 0}
+        assert target_db["urls"].find_one({"_id": "link07"}) == {
+            "_id": "link07",
+            "u": "https://example.com/7",
+            "h": 7,
+        }
+
+        # Asserting a re-import adds nothing
+        totals = import_file(target_db, path, batch_size=10, workers=2)
+        assert totals == {"added": 0, "existing": 25, "conflicts": 0, "invalid": 0}
+
+    @staticmethod
+    def test_import_allocates_ids_and_resumes(tmp_path):
+        """
+        Test that records without a short ID get one and that a checkpoint skips imported records.
+        """
+        db = test_client["resumeDB"]
+        path = tmp_path / "links.ndjson"
+        lines = [
+            json.dumps({"original_url": "https://example.com/first"}),
+            "not json",
+            json.dumps({"original_url": "https://example.com/second"}),
+            json.dumps({"original_url": "https://example.com/second"}),
+        ]
+        path.write_text("\n".join(lines) + "\n")
+
+        # Pretending an earlier run stopped after the first record
+        first_line = len(lines[0]) + 1
+        Checkpoint(str(path)).save({"records": 1, "offset": first_line})
+        totals = import_file(db, path, batch_size=2, resume=True)
+
+        # Asserting only the remaining records were read and the duplicate skipped
+        assert totals == {"added": 1, "existing": 1, "conflicts": 0, "invalid": 1}
+        document = db["urls"].find_one({"u": "https://example.com/second"})
+        assert len(document["_id"]) == 6
+        assert db["urls"].count_documents({}) == 1
+        assert not Checkpoint(str(path)).load()